@@ -0,0 +1,142 @@
+import collections
+import contextlib
+import itertools
+import threading
+import time
+import Queue
+
+# seconds a finished job can still be followed before it is forgotten
+JOB_TTL = 3600
+
+
+class Job(object):
+    """Run of a factory during some time, performed by slices so that it can be followed and cancelled"""
+    PENDING, RUNNING, DONE, CANCELLED, FAILED = "pending", "running", "done", "cancelled", "failed"
+    ids = itertools.count(1)
+
+    def __init__(self, factory, during, event_driven=False, slice=1000):
+        self.id = next(Job.ids)
+        self.factory = factory
+        self.during = during
+        self.event_driven = event_driven
+        self.slice = slice
+        self.target = None
+        self.status = Job.PENDING
+        self.error = None
+        self.finished_at = None
+        self.cancelled = threading.Event()
+
+    def run(self):
+        if self.cancelled.is_set():
+            self.status = Job.CANCELLED
+            return
+        self.status = Job.RUNNING
+        self.target = self.factory.time + self.during
+        try:
+            while self.factory.time < self.target and not self.cancelled.is_set():
+                self.factory.run(min(self.slice, self.target - self.factory.time), event_driven=self.event_driven)
+        except Exception, e:
+            self.status = Job.FAILED
+            self.error = "%s: %s" % (e.__class__.__name__, e)
+            return
+        self.status = Job.CANCELLED if self.cancelled.is_set() else Job.DONE
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_finished(self):
+        return self.status in (Job.DONE, Job.CANCELLED, Job.FAILED)
+
+    def get_data(self):
+        values = {}
+        values["id"] = self.id
+        values["factory"] = self.factory.reference
+        values["status"] = self.status
+        values["time"] = self.factory.time
+        values["target"] = self.target
+        values["error"] = self.error
+        return values
+
+
+class JobExecutor(object):
+    """Pool of threads running jobs in the background of the IOLoop.
+
+    Jobs of a same factory wait in a queue of their own and run one after the other,
+    jobs of different factories run concurrently. A thread only takes a factory whose
+    jobs are not already run by another thread, so jobs piling up for one factory
+    never hold the threads of the others. Finished jobs are forgotten after ttl
+    seconds. A factory is locked while a job runs it, its lock is forgotten as soon
+    as nothing holds it or waits for it.
+    """
+
+    def __init__(self, workers=4, ttl=JOB_TTL):
+        self.jobs = {}
+        self.ttl = ttl
+        self.finished = collections.deque()
+        self.queue = Queue.Queue()
+        # jobs waiting by factory reference, the factories taken by a thread are active
+        self.pending = {}
+        self.active = set()
+        # lock of each factory held or waited for, with the number of its users
+        self.locks = {}
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.work) for i in range(workers)]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def submit(self, job):
+        reference = job.factory.reference
+        with self.lock:
+            self.evict()
+            self.jobs[job.id] = job
+            self.pending.setdefault(reference, collections.deque()).append(job)
+            if reference not in self.active:
+                self.active.add(reference)
+                self.queue.put(reference)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            self.evict()
+            return self.jobs.get(job_id, None)
+
+    def evict(self):
+        now = time.time()
+        while self.finished and self.finished[0][0] + self.ttl <= now:
+            self.jobs.pop(self.finished.popleft()[1], None)
+
+    @contextlib.contextmanager
+    def hold_factory(self, factory, blocking=True):
+        """Lock factory against jobs and other holders, yield whether it could be locked"""
+        reference = factory.reference
+        with self.lock:
+            entry = self.locks.setdefault(reference, [threading.Lock(), 0])
+            entry[1] += 1
+        acquired = entry[0].acquire(blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                entry[0].release()
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[reference]
+
+    def work(self):
+        while True:
+            reference = self.queue.get()
+            with self.lock:
+                job = self.pending[reference].popleft()
+            with self.hold_factory(job.factory):
+                job.run()
+            with self.lock:
+                job.finished_at = time.time()
+                self.finished.append((job.finished_at, job.id))
+                if self.pending[reference]:
+                    # the next job of the factory waits behind the other factories
+                    self.queue.put(reference)
+                else:
+                    del self.pending[reference]
+                    self.active.discard(reference)
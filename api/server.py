@@ -1,8 +1,17 @@
+import contextlib
 import tornado.web
 import tornado.ioloop
+from api.jobs import Job, JobExecutor
 from core import Entity
+from core.snapshot import snapshot, fork
+from reporting.kpi import KPIs
 from reporting.report import Report
 
+# the registry only keeps weak references, factories forked by the server are kept here
+forked_factories = {}
+snapshots = {}
+executor = JobExecutor()
+
 class FactoryHandler(tornado.web.RequestHandler):
     def get_factory(self, factory_ID):
         factory = Entity.get_by_ref(int(factory_ID))
@@ -22,6 +31,24 @@ class ProductionUnit(FactoryHandler):
         report = Report()
         self.write(report.get_production_unit_data(int(factory_ID), pu_name))
 
+class Profiling(FactoryHandler):
+    def get(self, factory_ID):
+        report = Report()
+        self.write(report.get_profiling_data(int(factory_ID)))
+
+
+class KPIData(FactoryHandler):
+    def get(self, factory_ID):
+        report = Report()
+        self.write(report.get_kpi_data(int(factory_ID)))
+
+
+class CapacityData(FactoryHandler):
+    def get(self, factory_ID):
+        report = Report()
+        horizon = self.get_argument("horizon", None)
+        self.write(report.get_capacity_data(int(factory_ID), int(horizon) if horizon else None))
+
 
 class RemoteCommand(FactoryHandler):
     def post(self, factory_ID):
@@ -29,16 +56,82 @@ class RemoteCommand(FactoryHandler):
         action = self.get_argument("command")
         if action == "run":
             self.run()
+        elif action == "teardown":
+            with self.idle_factory():
+                self.factory.registry.teardown(self.factory)
+            forked_factories.pop(self.factory.reference, None)
+            snapshots.pop(self.factory.reference, None)
+        elif action == "profile":
+            with self.idle_factory():
+                self.profile()
+        elif action == "kpis":
+            with self.idle_factory():
+                self.factory.collect_kpis(KPIs())
+        elif action == "snapshot":
+            with self.idle_factory():
+                snapshots[self.factory.reference] = snapshot(self.factory)
+            self.write({"factory": self.factory.reference, "time": self.factory.time})
+        elif action == "fork":
+            with self.idle_factory():
+                self.fork()
+
+    @contextlib.contextmanager
+    def idle_factory(self):
+        """Hold the factory while it is not run by a job, answer 409 otherwise"""
+        with executor.hold_factory(self.factory, blocking=False) as idle:
+            if not idle:
+                raise tornado.web.HTTPError(409)
+            yield
+
+    def fork(self):
+        """Restore count factories from the last snapshot of the factory, or from its current state"""
+        data = snapshots.get(self.factory.reference) or snapshot(self.factory)
+        factories = fork(data, int(self.get_argument("count", 1)))
+        for factory in factories:
+            forked_factories[factory.reference] = factory
+        self.write({"factories": [factory.reference for factory in factories]})
+
+    def profile(self):
+        profiling = self.get_argument("profiling", "on")
+        if profiling == "on":
+            self.factory.enable_profiling()
+        elif profiling == "reset" and self.factory.profiler:
+            self.factory.profiler.reset()
+        elif profiling == "off":
+            self.factory.disable_profiling()
 
     def run(self):
         time = int(self.get_argument("time"))
-        self.factory.run(during=time)
+        event_driven = self.get_argument("event_driven", "false") == "true"
+        job = executor.submit(Job(self.factory, time, event_driven=event_driven))
+        self.write(job.get_data())
+
+
+class JobHandler(tornado.web.RequestHandler):
+    def get_job(self, job_ID):
+        job = executor.get(int(job_ID))
+        if not job:
+            raise tornado.web.HTTPError(404)
+        return job
+
+    def get(self, job_ID):
+        self.write(self.get_job(job_ID).get_data())
+
+    def post(self, job_ID):
+        job = self.get_job(job_ID)
+        if self.get_argument("command") == "cancel":
+            job.cancel()
+        self.write(job.get_data())
 
 
 application = tornado.web.Application([
     (r"/reports/([0-9]+)", FactoryConfiguration),
-    (r"/reports/([0-9]+)/productionunit/([a-z0-9]+)", ProductionUnit),
+    (r"/reports/([0-9]+)/productionunit/([\w.-]+)", ProductionUnit),
+    (r"/reports/([0-9]+)/profiling", Profiling),
+    (r"/reports/([0-9]+)/kpis", KPIData),
+    (r"/reports/([0-9]+)/capacity", CapacityData),
     (r"/command/([0-9]+)", RemoteCommand),
+    (r"/jobs/([0-9]+)", JobHandler),
 ])
 
 def start_server(application):
@@ -0,0 +1,101 @@
+"""Benchmarks of the simulation core.
+
+Each benchmark runs a workload of benchmarks.workloads at a given size in a process
+of its own and reports:
+
+- steps_per_sec: steps made by the workload per second of wall time
+- objects: objects tracked by the garbage collector created and still alive after the run
+- peak_memory_kb: growth of the peak resident memory of the process during the run
+
+Results are compared with a JSON baseline, see python -m benchmarks --help.
+"""
+import gc
+import json
+import multiprocessing
+import os
+import resource
+import time
+from core import Simulation
+from benchmarks.workloads import WORKLOADS
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def get_key(name, size):
+    return "%s[%d]" % (name, size)
+
+
+def get_benchmarks(names=None):
+    """(key, name, size) of the benchmarks whose workload is in names, all of them by default"""
+    return [(get_key(name, size), name, size) for name, workload, sizes in WORKLOADS
+            if not names or name in names for size in sizes]
+
+
+def measure(name, size):
+    workload = dict((name, workload) for name, workload, sizes in WORKLOADS)[name]
+    with Simulation():
+        run = workload(size)
+        gc.collect()
+        objects = len(gc.get_objects())
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.time()
+        steps = run()
+        elapsed = time.time() - start
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_memory
+        objects = len(gc.get_objects()) - objects
+    return {"steps": steps,
+            "seconds": elapsed,
+            "steps_per_sec": steps / elapsed if elapsed else float("inf"),
+            "objects": objects,
+            "peak_memory_kb": peak_memory}
+
+
+def _measure(task):
+    return measure(*task)
+
+
+def run_benchmarks(names=None):
+    """Measure each benchmark in a fresh process so that peak memory is its own"""
+    benchmarks = get_benchmarks(names)
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        results = pool.map(_measure, [(name, size) for key, name, size in benchmarks], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    return dict((key, result) for (key, name, size), result in zip(benchmarks, results))
+
+
+def load_baseline(path=BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE):
+    baseline = load_baseline(path)
+    for key, result in results.items():
+        baseline[key] = dict((metric, int(round(result[metric]))) for metric in ("steps_per_sec", "objects", "peak_memory_kb"))
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=4, sort_keys=True, separators=(",", ": "))
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions of results against the baseline, as (key, metric, baseline value, value).
+
+    A benchmark regresses when it is slower, or creates more objects or memory, than
+    its baseline by more than tolerance. Benchmarks without baseline are ignored.
+    """
+    regressions = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        result, reference = results[key], baseline[key]
+        if result["steps_per_sec"] < reference["steps_per_sec"] * (1 - tolerance):
+            regressions.append((key, "steps_per_sec", reference["steps_per_sec"], result["steps_per_sec"]))
+        for metric in ("objects", "peak_memory_kb"):
+            # a few objects or pages more are noise, not a regression
+            if result[metric] > reference[metric] * (1 + tolerance) + 1024:
+                regressions.append((key, metric, reference[metric], result[metric]))
+    return regressions
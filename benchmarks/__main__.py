@@ -0,0 +1,41 @@
+import argparse
+import sys
+from benchmarks import BASELINE, compare, get_benchmarks, load_baseline, run_benchmarks, save_baseline
+from benchmarks.workloads import WORKLOADS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark the simulation core against a baseline")
+    names = [name for name, workload, sizes in WORKLOADS]
+    parser.add_argument("workloads", nargs="*", help="workloads to run among %s, all of them by default" % ", ".join(names))
+    parser.add_argument("--baseline", default=BASELINE, help="JSON baseline, %(default)s by default")
+    parser.add_argument("--save", action="store_true", help="record the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative difference allowed before a regression, %(default)s by default")
+    args = parser.parse_args(argv)
+    for name in args.workloads:
+        if name not in names:
+            parser.error("unknown workload %s" % name)
+
+    results = run_benchmarks(args.workloads)
+    baseline = load_baseline(args.baseline)
+    print "%-28s %14s %14s %10s %10s" % ("benchmark", "steps/sec", "baseline", "objects", "peak kB")
+    for key, name, size in get_benchmarks(args.workloads):
+        result = results[key]
+        reference = baseline.get(key, {}).get("steps_per_sec")
+        print "%-28s %14.0f %14s %10d %10d" % (key, result["steps_per_sec"],
+                                               "%.0f" % reference if reference else "-",
+                                               result["objects"], result["peak_memory_kb"])
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for key, metric, reference, value in regressions:
+        print "REGRESSION %s %s: %s -> %s" % (key, metric, reference, value)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Workloads of the benchmark suite.
+
+A workload takes a size and prepares what it needs, it returns a callable which
+performs the timed part and returns the number of steps it made.
+"""
+from configuration import get_factory
+from core.factory import Factory
+from core.material import Material
+from core.operation import Operation, OperationGraph, Process, ParallelProcess
+from core.production_unit import ProductionUnit, StockingZone
+from core.specification import Specification, MaterialInputConstraint
+from core.worker import Worker
+
+FACTORY_STEPS = 20000
+PROCESS_STEPS = 20000
+STOCK_ADDS = 50000
+
+
+def factory_run(units):
+    """Factory.run with units production units, each loading yarn and producing with its own worker"""
+    factory = Factory(name="benchmark")
+    for i in range(units):
+        spec = Specification()
+        spec.add(MaterialInputConstraint(Material(type="yarn", quantity=1)))
+        spec.add_output_material(Material(type="textile", quantity=1, price=2))
+        factory.add_production_unit(ProductionUnit(spec, {"rate_by_minute": 0.5}, name="pu%d" % i))
+        factory.add_worker(Worker(working_hour=10 ** 9))
+    during = max(FACTORY_STEPS // units, 10)
+
+    def run():
+        factory.run(during)
+        return during * units
+    return run
+
+
+def process_chain(depth):
+    """Process of depth operations taking two steps each"""
+    process = Process(None, [Operation(time_to_perform=2) for i in range(depth)])
+
+    def run():
+        process.run(PROCESS_STEPS)
+        return PROCESS_STEPS
+    return run
+
+
+def parallel_process(width):
+    """ParallelProcess of width processes of four operations"""
+    processes = [Process(None, [Operation(time_to_perform=2) for i in range(4)]) for j in range(width)]
+    parallel = ParallelProcess(processes)
+    during = max(PROCESS_STEPS // width, 10)
+
+    def run():
+        parallel.run(during)
+        return during * width
+    return run
+
+
+def operation_graph(width):
+    """OperationGraph of width operations between a first and a last one, two steps each"""
+    graph = OperationGraph()
+    first = graph.add(Operation(time_to_perform=2))
+    branches = [graph.add(Operation(time_to_perform=2), after=[first]) for i in range(width)]
+    graph.add(Operation(time_to_perform=2), after=branches)
+    during = max(PROCESS_STEPS // width, 10)
+
+    def run():
+        graph.run(during)
+        return during * width
+    return run
+
+
+def stock_add(types):
+    """StockingZone.add_to_stock of materials of types different types"""
+    zone = StockingZone()
+    materials = [Material(type="material%d" % (i % types), quantity=1, price=1) for i in range(STOCK_ADDS)]
+
+    def run():
+        for material in materials:
+            zone.add_to_stock(material)
+        return len(materials)
+    return run
+
+
+def yaml_configuration(units):
+    lines = ["ID: 1", "name: benchmark", "materials:",
+             "    - type: yarn", "      price: 1", "    - type: textile", "      price: 2",
+             "production_units:"]
+    for i in range(units):
+        lines.extend(["    - name: pu%d" % i,
+                      "      rate: 0.5",
+                      "      inputs:",
+                      "          - input_type: yarn",
+                      "            input_quantity: 2",
+                      "      outputs:",
+                      "          - input_type: textile",
+                      "            input_quantity: 1"])
+    lines.append("workers:")
+    lines.extend(["    - working_hour: 8"] * units)
+    return "\n".join(lines)
+
+
+def load_configuration(units):
+    """configuration.get_factory on a YAML file with units production units and workers"""
+    yaml_conf = yaml_configuration(units)
+
+    def run():
+        get_factory(yaml_conf)
+        return units
+    return run
+
+
+WORKLOADS = [
+    ("factory_run", factory_run, [1, 10, 100, 1000]),
+    ("process_chain", process_chain, [1, 8, 64, 512]),
+    ("parallel_process", parallel_process, [1, 8, 64, 512]),
+    ("operation_graph", operation_graph, [1, 8, 64, 512]),
+    ("stock_add", stock_add, [10, 100, 1000]),
+    ("load_configuration", load_configuration, [10, 100, 1000]),
+]
@@ -1,10 +1,38 @@
+import collections
+import hashlib
+import yaml
+from configuration.schema import ConfigurationError, join, validate
+from core.batch import BatchFactory
 from core.factory import Factory
-from yaml import load
+from core.failure import Breakdowns
 from core.material import Material
 from core.production_unit import ProductionUnit
+from core.scheduler import POLICIES
+from core.shift import HOUR, ShiftCalendar
 from core.specification import Specification, MaterialInputConstraint
 from core.worker import Worker
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# immutable description of a factory, compiled once from its YAML configuration
+FactoryBlueprint = collections.namedtuple("FactoryBlueprint", "name production_units workers worker_policy seed")
+ProductionUnitBlueprint = collections.namedtuple("ProductionUnitBlueprint", "name rate spec line skills crew load_time mtbf mttr")
+WorkerBlueprint = collections.namedtuple("WorkerBlueprint", "working_hour skills calendar")
+
+BLUEPRINT_CACHE_SIZE = 128
+_blueprints = collections.OrderedDict()
+
+
+def load(yaml_conf):
+    document = yaml.load(yaml_conf, Loader=SafeLoader)
+    if document is None:
+        raise ConfigurationError("", "empty configuration")
+    return validate(document)
+
+
 def create_materials(yaml):
     materials = {}
     for material in yaml.get("materials", []):
@@ -12,27 +40,134 @@ def create_materials(yaml):
     return materials
 
 
-def create_spec(materials, production_unit):
+def create_spec(materials, spec_conf):
+    """Frozen specification, shared by all the production units built from it"""
     spec = Specification()
-    for input in production_unit.get("inputs", []):
+    for input in spec_conf.get("inputs", []):
         spec.add(MaterialInputConstraint(Material(type=input["input_type"], quantity=input["input_quantity"])))
-    for output in production_unit.get("outputs", []):
+    for output in spec_conf.get("outputs", []):
         spec.add_output_material(Material(type=output["input_type"], quantity=output["input_quantity"],
                                           price=materials[output["input_type"]]["price"]))
-    return spec
+    return spec.freeze()
+
+
+def get_names(name, number):
+    if number == 1:
+        return [name]
+    return ["%s%d" % (name, i) for i in range(1, number + 1)]
+
+
+def get_spec(materials, specs, production_unit):
+    if "spec" in production_unit:
+        return specs[production_unit["spec"]]
+    return create_spec(materials, production_unit)
+
+
+def compile_production_units(production_units, specs, prefix="", line=None):
+    for production_unit, spec in zip(production_units, specs):
+        for name in get_names(production_unit["name"], production_unit.get("number", 1)):
+            yield ProductionUnitBlueprint(prefix + name, production_unit.get("rate", 1), spec, line,
+                                          tuple(production_unit.get("skills", [])), production_unit.get("crew", 1),
+                                          production_unit.get("load_time", 1), get_minutes(production_unit.get("mtbf")),
+                                          get_minutes(production_unit.get("mttr")))
+
+
+def get_minutes(hours):
+    return None if hours is None else hours * HOUR
 
 
-def get_factory(yaml_conf):
+def create_calendar(shift):
+    """Weekly ShiftCalendar of a shift given in hours, None without shift"""
+    if shift is None:
+        return None
+    breaks = [(b["at"] * HOUR, b["minutes"]) for b in shift.get("breaks", [])]
+    return ShiftCalendar.weekly(shift["start"] * HOUR, shift["hours"] * HOUR, breaks, shift.get("days_off", []))
+
+
+def compile_factory(yaml_conf):
     yaml = load(yaml_conf)
-    factory = Factory(name=yaml["name"])
     materials = create_materials(yaml)
-    for production_unit in yaml["production_units"]:
-        spec = create_spec(materials, production_unit)
+    specs = dict((name, create_spec(materials, spec)) for name, spec in yaml.get("specs", {}).items())
+    # units out of any line, then the units of each line with the names of its replicas
+    groups = [(yaml.get("production_units", []), [None])]
+    for line in yaml.get("lines", []):
+        groups.append((line["production_units"], get_names(line["name"], line.get("number", 1))))
+    production_units = []
+    for units, lines in groups:
+        # replicated units and lines share the specification of their definition
+        unit_specs = [get_spec(materials, specs, production_unit) for production_unit in units]
+        for line in lines:
+            prefix = line + "." if line else ""
+            production_units.extend(compile_production_units(units, unit_specs, prefix, line))
+    workers = []
+    for worker in yaml.get("workers", []):
+        blueprint = WorkerBlueprint(worker.get("working_hour", 8) * 60, tuple(worker.get("skills", [])),
+                                    create_calendar(worker.get("shift")))
+        workers.extend([blueprint] * worker.get("number", 1))
+    return FactoryBlueprint(yaml["name"], tuple(production_units), tuple(workers),
+                            yaml.get("worker_policy", "last_released"), yaml.get("seed"))
+
+
+def get_blueprint(yaml_conf):
+    """Blueprint of a configuration, only parsed the first time its content is seen"""
+    if not isinstance(yaml_conf, basestring):
+        yaml_conf = yaml_conf.read()
+    key = hashlib.sha1(yaml_conf.encode("utf-8") if isinstance(yaml_conf, unicode) else yaml_conf).hexdigest()
+    blueprint = _blueprints.pop(key, None)
+    if blueprint is None:
+        blueprint = compile_factory(yaml_conf)
+    _blueprints[key] = blueprint
+    if len(_blueprints) > BLUEPRINT_CACHE_SIZE:
+        _blueprints.popitem(last=False)
+    return blueprint
+
+
+def build_factory(blueprint, seed=None):
+    """Units with a mtbf break down with draws seeded by seed, the seed of the configuration by default"""
+    factory = Factory(name=blueprint.name, worker_policy=POLICIES[blueprint.worker_policy])
+    for production_unit in blueprint.production_units:
         config = {}
-        config["rate_by_minute"]= production_unit.get("rate", 1)
-        factory.add_production_unit(ProductionUnit(spec=spec, config=config,  name=production_unit["name"]))
+        config["rate_by_minute"] = production_unit.rate
+        config["skills"] = production_unit.skills
+        config["crew"] = production_unit.crew
+        config["load_time"] = production_unit.load_time
+        if production_unit.mtbf:
+            config["mtbf"], config["mttr"] = production_unit.mtbf, production_unit.mttr
+        pu = ProductionUnit(spec=production_unit.spec, config=config, name=production_unit.name)
+        pu.line = production_unit.line
+        factory.add_production_unit(pu)
 
-    for worker in yaml.get("workers", []):
-        working_hour = worker.get("working_hour", 8) * 60
-        factory.add_worker(Worker(working_hour=working_hour))
-    return factory
\ No newline at end of file
+    for worker_blueprint in blueprint.workers:
+        worker = Worker(working_hour=worker_blueprint.working_hour, calendar=worker_blueprint.calendar)
+        worker.skills.extend(worker_blueprint.skills)
+        factory.add_worker(worker)
+    if any(production_unit.mtbf for production_unit in blueprint.production_units):
+        factory.simulate_failures(Breakdowns(blueprint.seed if seed is None else seed))
+    return factory
+
+
+def get_factory(yaml_conf, seed=None):
+    return build_factory(get_blueprint(yaml_conf), seed)
+
+
+def check_batch(blueprint):
+    """Raise a ConfigurationError for what BatchFactory does not model"""
+    if blueprint.worker_policy != "last_released":
+        raise ConfigurationError("worker_policy", "not supported by batch runs")
+    for production_unit in blueprint.production_units:
+        if production_unit.skills:
+            raise ConfigurationError(join(production_unit.name, "skills"), "not supported by batch runs")
+        if production_unit.mtbf:
+            raise ConfigurationError(join(production_unit.name, "mtbf"), "not supported by batch runs")
+        for key in ("load_time", "crew"):
+            if getattr(production_unit, key) != 1:
+                raise ConfigurationError(join(production_unit.name, key), "not supported by batch runs")
+    for worker in blueprint.workers:
+        if worker.calendar is not None:
+            raise ConfigurationError("workers.shift", "not supported by batch runs")
+
+
+def get_batch(yaml_conf, size, **parameters):
+    blueprint = get_blueprint(yaml_conf)
+    check_batch(blueprint)
+    return BatchFactory(build_factory(blueprint), size, **parameters)
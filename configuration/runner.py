@@ -0,0 +1,131 @@
+import math
+import multiprocessing
+from core import Simulation
+from core.event import Event
+from configuration import get_blueprint, get_factory
+from reporting.report import Report
+
+# two-sided 95% quantiles of the Student t distribution by degrees of freedom, 1.96 past 30
+T_QUANTILES_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                  2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                  2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def run_factory(task):
+    """Run one configuration and report on it, with a registry of entities of its own"""
+    yaml_conf, during, event_driven = task
+    with Simulation():
+        factory = get_factory(yaml_conf)
+        error = None
+        try:
+            factory.run(during, event_driven=event_driven)
+        except Exception, e:
+            error = "%s: %s" % (e.__class__.__name__, e)
+        report = Report()
+        return {"name": factory.name,
+                "factory": report.get_factory_data(factory.reference),
+                "production_units": dict((pu.name, report.get_production_unit_data(factory.reference, pu.name))
+                                         for pu in factory.production_units),
+                "error": error}
+
+
+def run_many(configs, during, workers=None, event_driven=False):
+    """Run each YAML configuration during the given time on a pool of processes.
+
+    Results come back in the order of configs. A run which stops on an event reports
+    the state it reached and the event in "error".
+    """
+    tasks = [(yaml_conf, during, event_driven) for yaml_conf in configs]
+    if workers == 1:
+        return map(run_factory, tasks)
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(run_factory, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+class RunningMean(object):
+    """Mean of a stream of values and the half-width of its 95% confidence interval, updated with
+    Welford's algorithm"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._squares = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._squares += delta * (value - self.mean)
+
+    @property
+    def half_width(self):
+        if self.count < 2:
+            return float("inf")
+        quantile = T_QUANTILES_95[self.count - 2] if self.count <= len(T_QUANTILES_95) + 1 else 1.96
+        return quantile * math.sqrt(self._squares / (self.count - 1) / self.count)
+
+    def is_precise(self, precision):
+        """Whether the half-width is at most precision relative to the mean"""
+        return self.half_width <= precision * abs(self.mean)
+
+    def get_data(self):
+        return {"mean": self.mean, "half_width": self.half_width}
+
+
+def run_replication(task):
+    """Units and value produced by each production unit in one run with failures drawn from seed"""
+    yaml_conf, during, seed, event_driven = task
+    with Simulation():
+        factory = get_factory(yaml_conf, seed)
+        try:
+            factory.run(during, event_driven=event_driven)
+        except Event:
+            # like run_factory, the run reports what it produced until the event
+            pass
+        return [(pu.name, pu.unit_produced, pu.value_produced) for pu in factory.production_units]
+
+
+def replicate(yaml_conf, during, precision=0.05, min_replications=5, max_replications=100, seed=None,
+              workers=None, event_driven=False):
+    """Run independent replications of a configuration with failures until the totals are precise.
+
+    Replication i draws its failures with the seed [seed, i], seed being the one of the
+    configuration by default. After each replication, in order, yields the running
+    mean and 95% confidence half-width of the units and value produced, in total and
+    by production unit. Stops once both totals have a half-width within precision of
+    their mean, after at least min_replications, or after max_replications.
+    """
+    if seed is None:
+        seed = get_blueprint(yaml_conf).seed or 0
+    tasks = [(yaml_conf, during, [seed, i], event_driven) for i in range(max_replications)]
+    totals = {"units_produced": RunningMean(), "value_produced": RunningMean()}
+    units = {}
+    pool = multiprocessing.Pool(workers) if workers != 1 else None
+    try:
+        results = pool.imap(run_replication, tasks) if pool else (run_replication(task) for task in tasks)
+        for count, result in enumerate(results, 1):
+            for name, unit_produced, value_produced in result:
+                statistics = units.setdefault(name, {"units_produced": RunningMean(),
+                                                     "value_produced": RunningMean()})
+                statistics["units_produced"].add(unit_produced)
+                statistics["value_produced"].add(value_produced)
+            totals["units_produced"].add(sum(unit_produced for name, unit_produced, value in result))
+            totals["value_produced"].add(sum(value for name, unit_produced, value in result))
+            precise = all(statistic.is_precise(precision) for statistic in totals.values())
+            yield {"replications": count, "precise": precise,
+                   "units_produced": totals["units_produced"].get_data(),
+                   "value_produced": totals["value_produced"].get_data(),
+                   "production_units": dict((name, dict((key, statistic.get_data())
+                                                        for key, statistic in statistics.items()))
+                                            for name, statistics in units.items())}
+            if precise and count >= min_replications:
+                break
+    finally:
+        if pool:
+            # replications still running are not needed any more
+            pool.terminate()
+            pool.join()
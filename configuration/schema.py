@@ -0,0 +1,149 @@
+"""Schema of factory configurations.
+
+A schema is a type, a dict of key -> (schema, required), a list of one schema for
+lists of items or a MappingOf(schema) for mappings of names to items. validate raises ConfigurationError with the path of the first
+offending value, for instance production_units[1].inputs[0].input_quantity.
+"""
+import numbers
+from core.scheduler import POLICIES
+
+
+class ConfigurationError(Exception):
+    def __init__(self, path, message):
+        Exception.__init__(self, "%s: %s" % (path or "configuration", message))
+        self.path = path
+
+
+class MappingOf(object):
+    def __init__(self, schema):
+        self.schema = schema
+
+
+NUMBER, TEXT = numbers.Real, basestring
+
+MATERIAL_QUANTITY = {"input_type": (TEXT, True), "input_quantity": (NUMBER, True)}
+
+SPEC = {"inputs": ([MATERIAL_QUANTITY], False), "outputs": ([MATERIAL_QUANTITY], False)}
+
+PRODUCTION_UNIT = dict(SPEC, **{"name": (TEXT, True),
+                                "number": (int, False),
+                                "rate": (NUMBER, False),
+                                "skills": ([TEXT], False),
+                                "crew": (int, False),
+                                "load_time": (int, False),
+                                "mtbf": (NUMBER, False),
+                                "mttr": (NUMBER, False),
+                                "spec": (TEXT, False)})
+
+# hours of a weekly shift, breaks start at some hours of the shift
+SHIFT = {"start": (NUMBER, True), "hours": (NUMBER, True),
+         "breaks": ([{"at": (NUMBER, True), "minutes": (NUMBER, True)}], False),
+         "days_off": ([int], False)}
+
+FACTORY = {
+    "ID": (int, False),
+    "name": (TEXT, True),
+    "materials": ([{"type": (TEXT, True), "price": (NUMBER, True)}], False),
+    "specs": (MappingOf(SPEC), False),
+    "production_units": ([PRODUCTION_UNIT], False),
+    "lines": ([{"name": (TEXT, True), "number": (int, False), "production_units": ([PRODUCTION_UNIT], True)}], False),
+    "workers": ([{"type": (TEXT, False), "number": (int, False), "working_hour": (NUMBER, False),
+                  "skills": ([TEXT], False), "shift": (SHIFT, False)}], False),
+    "worker_policy": (TEXT, False),
+    "seed": (int, False),
+}
+
+TYPE_NAMES = {NUMBER: "a number", TEXT: "a string", int: "an integer", dict: "a mapping", list: "a list"}
+
+
+def check(value, schema, path):
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            raise ConfigurationError(path, "expected %s" % TYPE_NAMES[dict])
+        for key in value:
+            if key not in schema:
+                raise ConfigurationError(join(path, key), "unknown key")
+        for key, (item_schema, required) in sorted(schema.items()):
+            if key in value:
+                check(value[key], item_schema, join(path, key))
+            elif required:
+                raise ConfigurationError(join(path, key), "missing")
+    elif isinstance(schema, MappingOf):
+        if not isinstance(value, dict):
+            raise ConfigurationError(path, "expected %s" % TYPE_NAMES[dict])
+        for key, item in sorted(value.items()):
+            check(item, schema.schema, join(path, key))
+    elif isinstance(schema, list):
+        if not isinstance(value, list):
+            raise ConfigurationError(path, "expected %s" % TYPE_NAMES[list])
+        for i, item in enumerate(value):
+            check(item, schema[0], "%s[%d]" % (path, i))
+    # booleans are integers for python, not for a configuration
+    elif not isinstance(value, schema) or isinstance(value, bool):
+        raise ConfigurationError(path, "expected %s" % TYPE_NAMES[schema])
+
+
+def join(path, key):
+    return "%s.%s" % (path, key) if path else key
+
+
+def check_number(item, path):
+    if item.get("number", 1) < 1:
+        raise ConfigurationError(join(path, "number"), "expected at least 1")
+
+
+def check_outputs(spec, path, prices):
+    for i, output in enumerate(spec.get("outputs", [])):
+        if output["input_type"] not in prices:
+            raise ConfigurationError("%s.outputs[%d].input_type" % (path, i),
+                                     "no price for material %s" % output["input_type"])
+
+
+def check_shift(shift, path):
+    if not 0 < shift["hours"] <= 24:
+        raise ConfigurationError(join(path, "hours"), "expected between 0 and 24 hours")
+    for i, day in enumerate(shift.get("days_off", [])):
+        if not 0 <= day < 7:
+            raise ConfigurationError("%s.days_off[%d]" % (path, i), "expected a day between 0 and 6")
+    for i, pause in enumerate(shift.get("breaks", [])):
+        if not 0 <= pause["at"] < shift["hours"]:
+            raise ConfigurationError("%s.breaks[%d].at" % (path, i), "expected during the shift")
+
+
+def check_production_unit(production_unit, path, prices, specs):
+    check_number(production_unit, path)
+    for key in ("crew", "load_time"):
+        if production_unit.get(key, 1) < 1:
+            raise ConfigurationError(join(path, key), "expected at least 1")
+    for key, other in (("mtbf", "mttr"), ("mttr", "mtbf")):
+        if key in production_unit and production_unit[key] <= 0:
+            raise ConfigurationError(join(path, key), "expected a positive number of hours")
+        if key in production_unit and other not in production_unit:
+            raise ConfigurationError(join(path, other), "missing with %s" % key)
+    check_outputs(production_unit, path, prices)
+    if "spec" in production_unit:
+        if production_unit["spec"] not in specs:
+            raise ConfigurationError(join(path, "spec"), "unknown spec %s" % production_unit["spec"])
+        if "inputs" in production_unit or "outputs" in production_unit:
+            raise ConfigurationError(join(path, "spec"), "a spec excludes inputs and outputs")
+
+
+def validate(document):
+    check(document, FACTORY, "")
+    prices = set(material["type"] for material in document.get("materials", []))
+    specs = document.get("specs", {})
+    for name, spec in sorted(specs.items()):
+        check_outputs(spec, join("specs", name), prices)
+    for i, production_unit in enumerate(document.get("production_units", [])):
+        check_production_unit(production_unit, "production_units[%d]" % i, prices, specs)
+    for i, line in enumerate(document.get("lines", [])):
+        check_number(line, "lines[%d]" % i)
+        for j, production_unit in enumerate(line["production_units"]):
+            check_production_unit(production_unit, "lines[%d].production_units[%d]" % (i, j), prices, specs)
+    for i, worker in enumerate(document.get("workers", [])):
+        check_number(worker, "workers[%d]" % i)
+        if "shift" in worker:
+            check_shift(worker["shift"], "workers[%d].shift" % i)
+    if document.get("worker_policy", "last_released") not in POLICIES:
+        raise ConfigurationError("worker_policy", "expected one of %s" % ", ".join(sorted(POLICIES)))
+    return document
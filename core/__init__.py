@@ -1,25 +1,150 @@
-ref_counter = 1
-entity_list = {}
+import weakref
 
 class AlreadyUsedID(Exception):pass
 
+
+class Registry(object):
+    """Entities of a simulation by reference and by (type, name).
+
+    Entities are only weakly referenced: the registry never keeps a factory alive.
+    """
+
+    def __init__(self):
+        self.ref_counter = 1
+        self._by_ref = weakref.WeakValueDictionary()
+        self._by_name = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._by_ref)
+
+    def register(self, entity):
+        reference = self.ref_counter
+        self.ref_counter += 1
+        self._by_ref[reference] = entity
+        return reference
+
+    def rename(self, entity, old_name, name):
+        key = (type(entity), old_name)
+        if self._by_name.get(key) is entity:
+            del self._by_name[key]
+        if name:
+            self._by_name[(type(entity), name)] = entity
+
+    def get(self, reference):
+        return self._by_ref.get(reference, None)
+
+    def get_by_name(self, entity_type, name):
+        return self._by_name.get((entity_type, name), None)
+
+    def remove(self, entity):
+        if self._by_ref.get(entity.reference) is entity:
+            del self._by_ref[entity.reference]
+        self.rename(entity, entity.name, None)
+
+    def teardown(self, factory):
+        """Remove a factory with its production units and workers"""
+        for entity in factory.production_units + factory.workers + [factory]:
+            self.remove(entity)
+
+    def clear(self):
+        self.ref_counter = 1
+        self._by_ref.clear()
+        self._by_name.clear()
+
+
+default_registry = Registry()
+_simulations = []
+
+def get_registry():
+    if _simulations:
+        return _simulations[-1].registry
+    return default_registry
+
+def reset_entities():
+    default_registry.clear()
+
+
+class Simulation(object):
+    """Context owning the registry of the entities created while it is active.
+
+    with Simulation() as simulation:
+        factory = get_factory(conf)
+    """
+
+    def __init__(self):
+        self.registry = Registry()
+
+    def __enter__(self):
+        _simulations.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _simulations.remove(self)
+
+
 class Entity(object):
+    # SignalBus of the factory the entity belongs to, events are raised when None
+    signals = None
+
     def __init__(self, ID=None):
-        global ref_counter
-        self.reference = ref_counter
-        ref_counter += 1
-        entity_list[self.reference] = self
+        self.registry = get_registry()
+        self.reference = self.registry.register(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["registry"], state["reference"]
+        return state
+
+    def __setstate__(self, state):
+        # a restored entity is a new entity of the current registry
+        self.__dict__.update(state)
+        self.registry = get_registry()
+        self.reference = self.registry.register(self)
+        self.registry.rename(self, None, self.name)
+
+    @property
+    def name(self):
+        return self.__dict__.get("_name", "")
+
+    @name.setter
+    def name(self, name):
+        self.registry.rename(self, self.name, name)
+        self._name = name
 
     @staticmethod
     def get_by_ref(ref_id):
-        return entity_list.get(ref_id, None)
+        return get_registry().get(ref_id)
+
+    @classmethod
+    def get_by_name(cls, name):
+        return get_registry().get_by_name(cls, name)
 
 class Runnable(object):
 
     def __init__(self):
         self.time = 0
 
-    def run(self, i=1):
+    def run(self, i=1, event_driven=False):
+        if event_driven:
+            return self.run_event_driven(i)
         for i in range(i):
             self.do_step()
-            self.time += 1
\ No newline at end of file
+            self.time += 1
+
+    def run_event_driven(self, i=1):
+        end = self.time + i
+        while self.time < end:
+            steps = min(self.quiet_steps(), end - self.time)
+            if steps > 0:
+                self.skip(steps)
+                self.time += steps
+            else:
+                self.do_step()
+                self.time += 1
+
+    def quiet_steps(self):
+        """Number of next steps which can be applied at once with skip"""
+        return 0
+
+    def skip(self, steps):
+        pass
@@ -0,0 +1,205 @@
+import numpy
+from core import Runnable
+from core.operation import get_ratio
+
+
+class BatchFactory(Runnable):
+    """Run many variants of a factory in lockstep, one row of arrays per scenario.
+
+    Every production unit follows the protocol of Factory.run: start, load each input of
+    its spec, then produce until the inputs are consumed. Operations are stepped and
+    staffed in the same order as Factory.do_step. A scenario never stops the batch: a
+    load without worker waits for one, a production unit with a full stock or with
+    invalid inputs stays stalled and frees its worker. Loads take one minute and one
+    worker of any skill, handed out by the last_released policy, workers have no shift
+    calendar and production units never break down: configuration.get_batch rejects
+    the other configurations.
+
+    Scenario parameters are a scalar, one value per scenario or, for rate and
+    stock_size, one row per scenario with a column per production unit. A stock_size of
+    None is unlimited. working_hour is in minutes like for Worker. Progress is counted
+    exactly in integer steps of each rate read as a fraction, like Operation does.
+    """
+
+    def __init__(self, factory, size, rate=None, workers=None, working_hour=None, stock_size=None):
+        Runnable.__init__(self)
+        self.size = size
+        self.rows = numpy.arange(size)
+        self.names = [pu.name for pu in factory.production_units]
+        self._compile(factory.production_units)
+        shape = (size, len(self.names))
+
+        if rate is None:
+            rate = [[pu.rate for pu in factory.production_units]]
+        self.rate = self._per_scenario(rate, shape[1])
+        self.rate_step, self.rate_scale = self._get_ratios(self.rate)
+        if stock_size is None:
+            stock_size = [[pu.output_stocking_zone.size or numpy.inf for pu in factory.production_units]]
+        self.stock_size = self._per_scenario(stock_size, shape[1])
+        self.stock_size[numpy.isnan(self.stock_size)] = numpy.inf
+
+        self.phase = numpy.zeros(shape, dtype=int)
+        # progress of the production in 1 / rate_scale
+        self.progress = numpy.zeros(shape, dtype=numpy.int64)
+        self.inputs = numpy.zeros(shape + (self.require.shape[1],))
+        self.stock = numpy.zeros(shape)
+        self.units_produced = numpy.zeros(shape, dtype=int)
+        self.stalled = numpy.zeros(shape, dtype=bool)
+        self.worker = -numpy.ones(shape, dtype=int)
+        # position of the current operation of each production unit in current_operations
+        self.rank = numpy.zeros(shape, dtype=int) + numpy.arange(shape[1])
+        self.next_rank = numpy.zeros(size, dtype=int) + shape[1]
+        self._init_workers(factory, workers, working_hour)
+
+    def _compile(self, production_units):
+        specs = [pu.spec for pu in production_units]
+        inputs = [spec.get_inputs() if spec else [] for spec in specs]
+        types = [[] for pu in production_units]
+        for j, materials in enumerate(inputs):
+            for material in materials:
+                if material.type not in types[j]:
+                    types[j].append(material.type)
+        columns = max([len(t) for t in types] or [0])
+        loads = max([len(materials) for materials in inputs] or [0])
+
+        self.loads = numpy.array([len(materials) for materials in inputs], dtype=int)
+        self.load_column = numpy.zeros((len(specs), max(loads, 1)), dtype=int)
+        self.load_quantity = numpy.zeros((len(specs), max(loads, 1)))
+        self.require = numpy.zeros((len(specs), columns))
+        self.consume = numpy.zeros((len(specs), columns))
+        for j, materials in enumerate(inputs):
+            for i, material in enumerate(materials):
+                column = types[j].index(material.type)
+                self.load_column[j, i] = column
+                self.load_quantity[j, i] = material.quantity
+                self.require[j, column] = max(self.require[j, column], material.quantity)
+                self.consume[j, column] += material.quantity
+        outputs = [spec.output_materials if spec else [] for spec in specs]
+        self.output_quantity = numpy.array([sum([m.quantity for m in materials]) for materials in outputs])
+        self.output_value = numpy.array([sum([m.price for m in materials]) for materials in outputs])
+
+    def _per_scenario(self, value, columns):
+        """Broadcast a scalar, one value per scenario or one row per scenario to all scenarios"""
+        value = numpy.array(value, dtype=float)
+        if value.ndim == 1:
+            value = value.reshape((self.size, 1))
+        return numpy.zeros((self.size, columns)) + value
+
+    def _get_ratios(self, rate):
+        step = numpy.zeros(rate.shape, dtype=numpy.int64)
+        scale = numpy.ones(rate.shape, dtype=numpy.int64)
+        for value in numpy.unique(rate):
+            if value > 0:
+                cells = rate == value
+                step[cells], scale[cells] = get_ratio(float(value))
+        return step, scale
+
+    def _init_workers(self, factory, workers, working_hour):
+        hours = [worker.working_hour for worker in factory.workers] or [8 * 60]
+        if workers is None:
+            workers = len(factory.workers)
+        self.workers = numpy.zeros(self.size, dtype=int) + workers
+        columns = max(self.workers.max(), 1)
+        if working_hour is None and len(hours) >= columns:
+            working_hour = [hours[:columns]]
+        elif working_hour is None:
+            working_hour = hours[0]
+        self.working_hour = self._per_scenario(working_hour, columns)
+        self.hours_worked = numpy.zeros((self.size, columns))
+        # available workers as a stack, the last one is handed out first like in Factory
+        self.pool = numpy.zeros((self.size, columns), dtype=int) + numpy.arange(columns)
+        self.pool_size = self.workers.copy()
+
+    def do_step(self):
+        order = numpy.argsort(self.rank, axis=1)
+        for position in range(order.shape[1]):
+            self._step_operation(order[:, position])
+
+    def _step_operation(self, pu):
+        rows = self.rows
+        index = (rows, pu)
+        active = ~self.stalled[index]
+        worker = self.worker[index]
+        phase = self.phase[index]
+
+        # replace workers whose day of work is over, then staff operations
+        has_worker = worker >= 0
+        exhausted = has_worker & (self.hours_worked[rows, worker] >= self.working_hour[rows, worker])
+        worker[exhausted] = -1
+        self._take_workers(worker, active & (worker < 0))
+        has_worker = worker >= 0
+
+        loads = self.loads[pu]
+        loading = (phase >= 1) & (phase <= loads)
+        running = active & (has_worker | ~loading)
+        working = numpy.nonzero(running & has_worker)[0]
+        self.hours_worked[working, worker[working]] += 1
+
+        complete = running & ((phase == 0) | loading)
+        load = numpy.nonzero(running & loading)[0]
+        step = phase[load] - 1
+        column = self.load_column[pu[load], step]
+        self.inputs[load, pu[load], column] += self.load_quantity[pu[load], step]
+        complete |= self._produce(pu, running & (phase == loads + 1))
+
+        done = numpy.nonzero(complete)[0]
+        phase[done] = numpy.where(phase[done] <= loads[done], phase[done] + 1, 1)
+        self.phase[index] = phase
+        self.rank[done, pu[done]] = self.next_rank[done]
+        self.next_rank[done] += 1
+        self._release_workers(worker, numpy.nonzero((complete | self.stalled[index]) & has_worker)[0])
+        self.worker[index] = worker
+
+    def _produce(self, pu, producing):
+        index = (self.rows, pu)
+        inputs = self.inputs[index]
+        progress = self.progress[index]
+        step = self.rate_step[index]
+        stock = self.stock[index]
+
+        total = inputs.sum(axis=1)
+        progress[producing & (total == 0)] = 0
+        first = producing & (progress == 0)
+        progress[first] += step[first]
+
+        valid = (total > 0) & numpy.all(inputs >= self.require[pu], axis=1)
+        self.stalled[index] |= producing & ~valid
+        producing = producing & valid
+
+        ready = producing & (progress == self.rate_scale[index])
+        blocked = ready & (stock >= self.stock_size[index])
+        made = ready & ~blocked
+        inputs[made] -= self.consume[pu[made]]
+        stock[made] += self.output_quantity[pu[made]]
+        self.units_produced[index] += made
+        progress[made] = 0
+
+        moving = producing & ~blocked
+        progress[moving] += step[moving]
+        done = moving & (inputs.sum(axis=1) == 0)
+        # like a parked operation of Factory, nothing makes room in the stock again
+        self.stalled[index] |= blocked | (moving & ~done & (progress == self.rate_scale[index]) &
+                                          (stock >= self.stock_size[index]))
+        self.inputs[index] = inputs
+        self.progress[index] = progress
+        self.stock[index] = stock
+        return done
+
+    def _take_workers(self, worker, waiting):
+        rows = numpy.nonzero(waiting & (self.pool_size > 0))[0]
+        self.pool_size[rows] -= 1
+        worker[rows] = self.pool[rows, self.pool_size[rows]]
+
+    def _release_workers(self, worker, rows):
+        ids = worker[rows]
+        # a worker whose day of work is over does not come back
+        back = rows[self.hours_worked[rows, ids] < self.working_hour[rows, ids]]
+        self.pool[back, self.pool_size[back]] = worker[back]
+        self.pool_size[back] += 1
+        worker[rows] = -1
+
+    def get_results(self):
+        return {"production_units": self.names,
+                "units_produced": self.units_produced.copy(),
+                "value_produced": self.units_produced * self.output_value,
+                "stock": self.stock.copy()}
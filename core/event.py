@@ -4,7 +4,16 @@ from core import Runnable
 logger = logging.getLogger()
 
 
-class Event(Exception):
+class Signal(object):
+    """Something which happened to an entity, dispatched by a SignalBus"""
+    def __init__(self, entity=None):
+        self.entity = entity
+
+    def react(self, entity):
+        pass
+
+
+class Event(Exception, Signal):
     def __init__(self, entity=None):
         self.entity = entity
 
@@ -21,13 +30,13 @@ class CannotPerformOperation(CannotProduce): pass
 
 
 
-class Failure(object):
+class Failure(Signal):
     def react(self, production_unit):
         from core.production_unit import ProductionUnitFAILUREState
         production_unit.set_state(ProductionUnitFAILUREState)
 
 
-class Fix(object):
+class Fix(Signal):
     def react(self, production_unit):
         from core.production_unit import ProductionUnitSTARTEDState
         production_unit.set_state(ProductionUnitSTARTEDState)
\ No newline at end of file
@@ -1,54 +1,351 @@
+import itertools
 import logging
 from core import Runnable, Entity
 from core.event import DayOfWorkIsOver
+from core.line import LineGraph
+from core.operation import SPACE, STOCK
+from core.production_unit import ProductionUnit
+from core.profiling import Profiler
+from core.scheduler import EventQueue, WorkerPool, last_released
+from core.signals import SignalBus
 
 logger = logging.getLogger()
 
 class Factory(Runnable, Entity):
-    def __init__(self, name="", ID=None):
+    def __init__(self, name="", ID=None, worker_policy=last_released):
         Entity.__init__(self, ID)
         Runnable.__init__(self)
         self.workers = []
-        self.available_workers = []
+        self.worker_pool = WorkerPool(worker_policy)
         self.production_units = []
+        self.production_units_by_name = {}
         self.current_operations = []
+        self.lines = LineGraph([])
+        # operations blocked by a full or empty stocking zone, until the zone changes
+        self.parked = {}
+        self.parked_by_zone = {}
+        self.woken = []
         self.name = name
+        self.profiler = None
+        self.telemetry = None
+        self.kpis = None
+        # an operation without worker waits for a busy one instead of stopping the run
+        # with NoWorkerToPerformAction, whether KPIs are collected or not
+        self.wait_for_workers = True
+        # next start or end of shift of each worker with a calendar
+        self.shifts = EventQueue()
+        self.shift_changes = 0
+        self.failures = None
+        self.signals = SignalBus()
+        self.signals.subscribe(DayOfWorkIsOver, self.on_day_of_work_is_over_event)
+
+    def __getstate__(self):
+        state = Entity.__getstate__(self)
+        # a restored factory would append to the file of this one, it records no telemetry
+        state["telemetry"] = None
+        return state
 
     def add_worker(self, worker):
+        worker.signals = self.signals
         self.workers.append(worker)
+        if worker.calendar is not None:
+            self.change_shift(worker)
+        self.worker_pool.add(worker)
+
+    def change_shift(self, worker):
+        """Start or end the shift of worker at the current time and schedule its next change"""
+        interval = worker.calendar.get_interval(self.time)
+        if interval:
+            worker.start_shift(interval[1] - self.time)
+        else:
+            worker.end_shift()
+        change = worker.calendar.next_change(self.time)
+        if change != float("inf"):
+            self.shifts.push(change, self.shift_changes, worker)
+            self.shift_changes += 1
+
+    def apply_shifts(self):
+        for rank, worker in self.shifts.pop(self.time):
+            self.change_shift(worker)
+            if worker in self.worker_pool.busy:
+                # its operation lets it go at the next step if the shift is over
+                continue
+            if worker.remaining_hours() > 0:
+                self.worker_pool.release(worker)
+            else:
+                self.worker_pool.retire(worker)
+
+    @property
+    def available_workers(self):
+        return self.worker_pool.get_free_workers()
 
     def add_production_unit(self, pu):
+        pu.signals = self.signals
         self.production_units.append(pu)
+        self.production_units_by_name[pu.name] = pu
+
+    def get_production_unit(self, name):
+        pu = self.production_units_by_name.get(name)
+        if pu is None or pu.name != name:
+            # a production unit may have been renamed after it was added
+            self.production_units_by_name = dict((pu.name, pu) for pu in self.production_units)
+            pu = self.production_units_by_name.get(name)
+        return pu
+
+    def simulate_failures(self, breakdowns):
+        """Break down and repair production units from now on, see core.failure.Breakdowns"""
+        breakdowns.start(self)
+        self.failures = breakdowns
+        return breakdowns
+
+    def apply_failures(self):
+        for event in self.failures.pop(self.time):
+            self.signals.emit(event)
+        self.signals.drain()
+
+    def enable_profiling(self):
+        """Time the operations of the factory from now on, see Profiler"""
+        if self.profiler is None:
+            self.profiler = Profiler()
+        return self.profiler
+
+    def disable_profiling(self):
+        self.profiler = None
+
+    def record_telemetry(self, telemetry):
+        """Sample the state of the factory with telemetry, see reporting.telemetry.Telemetry"""
+        self.telemetry = telemetry
+        return telemetry
+
+    def collect_kpis(self, kpis):
+        """Update kpis at every step from now on, see reporting.kpi.KPIs"""
+        kpis.start(self)
+        self.kpis = kpis
+        return kpis
 
     def init_operations(self):
-        for machine in self.production_units:
-            self.current_operations.append(machine.protocol.next())
+        self.build_lines()
+        # a factory which already ran carries on with its current operations
+        if not self.current_operations:
+            for machine in self.production_units:
+                self.current_operations.append(machine.protocol.next())
+        if self.lines:
+            self.current_operations.sort(key=lambda operation: self.lines.position[operation.production_unit])
+
+    def build_lines(self):
+        """Chain the production units sharing stocking zones, which are then stepped upstream first.
 
-        self.available_workers = self.workers[:]
+        A unit fed by others no longer loads the materials they make.
+        """
+        self.lines = LineGraph(self.production_units)
+        for pu in self.lines.upstream:
+            pu.protocol.feed(self.lines.get_fed_types(pu))
+
+    def park(self, operation, kind):
+        """Block operation until its stocking zone changes if it waits for kind, see Operation.waits_for"""
+        zone = operation.waits_for(kind)
+        if zone is None:
+            return False
+        self.parked[operation] = zone
+        if zone not in self.parked_by_zone:
+            zone.listen(self.on_zone_changed)
+        self.parked_by_zone.setdefault(zone, []).append(operation)
+        for worker in [operation.worker] + operation.helpers:
+            self.release_worker(worker)
+        operation.worker, operation.helpers = None, []
+        return True
+
+    def on_zone_changed(self, zone):
+        blocked = []
+        for operation in self.parked_by_zone.pop(zone):
+            # a blocked unit waits until the zone has room again
+            if zone.is_full() and operation.waits_for(SPACE) is zone:
+                blocked.append(operation)
+            else:
+                self.woken.append(operation)
+        if blocked:
+            self.parked_by_zone[zone] = blocked
+            zone.listen(self.on_zone_changed)
+
+    def wake_operations(self):
+        """Operations woken during the step, they go on from the next step"""
+        woken, self.woken = self.woken, []
+        for operation in woken:
+            del self.parked[operation]
+        return woken
 
     def execute_operation(self, operation):
-        if self.available_workers:
-            operation.worker = self.available_workers.pop()
-        operation.run()
+        if operation.production_unit.get_state() == ProductionUnit.FAILURE:
+            return
+        if self.parked and operation in self.parked:
+            return
+        if self.lines.upstream and self.lines.is_fed(operation.production_unit) and self.park(operation, STOCK):
+            return
+        if operation.worker and not operation.worker.remaining_hours():
+            self.signals.emit(DayOfWorkIsOver(operation.worker))
+            self.worker_pool.retire(operation.worker)
+            operation.worker = None
+        if not operation.worker:
+            operation.worker = self.worker_pool.acquire(operation, wait=self.wait_for_workers)
+        if operation.worker and len(operation.helpers) < operation.crew_size - 1 or operation.helpers:
+            self.staff_crew(operation)
+        if not operation.worker and self.wait_for_workers and self.is_waiting_for_worker(operation):
+            if self.kpis is not None:
+                self.kpis.on_wait(operation)
+            return
+        if self.profiler is None:
+            operation.run()
+        else:
+            self.profiler.run(operation)
         if operation.is_operation_complete():
+            if self.profiler is not None:
+                return self.profiler.call("completion", operation, self.complete_operation, operation)
+            return self.complete_operation(operation)
+        if operation.production_unit.output_stocking_zone.size:
+            self.park(operation, SPACE)
+
+    def staff_crew(self, operation):
+        """Let go the helpers of operation whose day is over and complete its crew with free workers"""
+        for helper in [helper for helper in operation.helpers if not helper.remaining_hours()]:
+            operation.helpers.remove(helper)
+            self.worker_pool.retire(helper)
+        while operation.worker and len(operation.helpers) < operation.crew_size - 1:
+            helper = self.worker_pool.acquire(operation, wait=False)
+            if helper is None:
+                break
+            operation.helpers.append(helper)
+
+    def complete_operation(self, operation):
+        # a cycle of one step hands out the same operation again, reset without its workers
+        workers = [operation.worker] + operation.helpers
+        next_operation = operation.production_unit.protocol.next()
+        if self.lines:
+            # chained units keep their place in the line
+            self.current_operations[self.current_operations.index(operation)] = next_operation
+        else:
             self.current_operations.remove(operation)
-            self.current_operations.append(operation.production_unit.protocol.next())
-            self.available_workers.append(operation.worker)
+            self.current_operations.append(next_operation)
+        for worker in workers:
+            self.release_worker(worker)
+        return next_operation
+
+    def is_waiting_for_worker(self, operation):
+        """Whether operation needs a worker and one of the busy workers will be released"""
+        return operation.needs_worker() and self.worker_pool.can_staff_later(operation)
 
-    def run(self, during=1):
+    def release_worker(self, worker):
+        if not worker:
+            return
+        self.worker_pool.release(worker)
+        if not worker.remaining_hours():
+            self.signals.emit(DayOfWorkIsOver(worker))
+
+    def run(self, during=1, event_driven=False):
         self.init_operations()
-        super(Factory, self).run(during)
+        try:
+            super(Factory, self).run(during, event_driven)
+        finally:
+            # samples taken before an event stopped the run are kept as well
+            if self.telemetry is not None:
+                self.telemetry.flush()
 
     def do_step(self):
+        if self.shifts and self.shifts.next_time() <= self.time:
+            self.apply_shifts()
+        if self.failures and self.failures.next_time() <= self.time:
+            self.apply_failures()
+        for operation in self.current_operations[:]:
+            self.execute_operation(operation)
+        if self.woken:
+            self.wake_operations()
+        self.signals.drain()
+        if self.telemetry is not None:
+            self.telemetry.sample(self, self.time + 1)
+        if self.kpis is not None:
+            self.kpis.on_step(self, self.time + 1)
+
+    def run_event_driven(self, during=1):
+        """Same as run but only step operations when something else than their progress happens.
+
+        Each operation is scheduled at its next interesting time: its completion, the end
+        of the shift of its worker or the next product made, which may fill a stock.
+        Operations of production units sharing a stocking zone are stepped every minute.
+        Shift changes of workers with a calendar are events as well, no operation is
+        skipped past the next one, nor past the next failure or repair of a production
+        unit, nor past the next sample of the telemetry. Operations blocked by a stocking
+        zone are left out of the queue until the zone wakes them up, those of a broken
+        down unit until the next failure or repair.
+        """
+        end = self.time + during
+        ranks = itertools.count()
+        events = EventQueue()
+        shared_units = self.get_units_sharing_zones()
+        parked_ranks = {}
         for operation in self.current_operations:
-            try:
-                self.execute_operation(operation)
-            except DayOfWorkIsOver, e:
-                self.on_day_of_work_is_over(e.entity)
-                self.execute_operation(operation)
+            if operation in self.parked:
+                parked_ranks[operation] = next(ranks)
+            else:
+                events.push(self.time, next(ranks), operation)
+
+        while events and self.get_next_time(events) < end:
+            self.time = self.get_next_time(events)
+            if self.shifts and self.shifts.next_time() <= self.time:
+                self.apply_shifts()
+            if self.failures and self.failures.next_time() <= self.time:
+                self.apply_failures()
+            for rank, operation in events.pop(self.time):
+                next_operation = self.execute_operation(operation)
+                if next_operation:
+                    events.push(self.time + 1, rank if self.lines else next(ranks), next_operation)
+                elif operation in self.parked:
+                    parked_ranks[operation] = rank
+                elif operation.production_unit.get_state() == ProductionUnit.FAILURE and self.failures:
+                    # nothing happens to it before the next failure or repair
+                    events.push(min(self.failures.next_time(), end), rank, operation)
+                else:
+                    steps = 0
+                    # an operation waiting for a worker has to ask for one every step
+                    if (operation.worker or not self.workers) and operation.production_unit not in shared_units\
+                       and operation.production_unit.get_state() != ProductionUnit.FAILURE:
+                        # the next sample of the telemetry may be due at the end of this step
+                        steps = max(min(operation.quiet_steps(), min(end, self.get_next_time()) - self.time - 1), 0)
+                    if steps > 0:
+                        if self.profiler is None:
+                            operation.skip(steps)
+                        else:
+                            self.profiler.call("skip", operation, operation.skip, steps)
+                        operation.time += steps
+                    events.push(self.time + 1 + steps, rank, operation)
+            if self.woken:
+                for operation in self.wake_operations():
+                    events.push(self.time + 1, parked_ranks.pop(operation), operation)
+            self.signals.drain()
+            if self.telemetry is not None:
+                self.telemetry.sample(self, self.time + 1)
+            if self.kpis is not None:
+                self.kpis.on_step(self, self.time + 1)
+        self.time = end
+        if self.kpis is not None:
+            # the minutes skipped after the last event
+            self.kpis.on_step(self, end)
+
+    def get_next_time(self, events=None):
+        """Time of the next shift change, failure, repair, operation in events or sample of telemetry"""
+        times = [queue.next_time() for queue in (events, self.shifts, self.failures) if queue]
+        if self.telemetry is not None:
+            # a sample at time t records the state after the step of t - 1
+            times.append(max(self.telemetry.next_sample - 1, self.time))
+        return min(times) if times else float("inf")
+
+    def get_units_sharing_zones(self):
+        units_by_zone = {}
+        for pu in self.production_units:
+            for zone in (pu.inputs_stocking_zone, pu.output_stocking_zone):
+                units_by_zone.setdefault(id(zone), []).append(pu)
+        return [pu for units in units_by_zone.values() if len(units) > 1 for pu in units]
 
+    def on_day_of_work_is_over_event(self, event):
+        self.on_day_of_work_is_over(event.entity)
 
     def on_day_of_work_is_over(self, worker):
-        logger.info("-"*10)
-        logger.info("On day is over")
-        print self.available_workers
+        logger.debug("Day of work is over for %s", worker)
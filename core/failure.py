@@ -0,0 +1,50 @@
+import numpy
+from core.event import Failure, Fix
+from core.scheduler import EventQueue
+
+BLOCK_SIZE = 1024
+
+
+class Breakdowns(object):
+    """Failures and repairs of the production units with a mtbf in their config.
+
+    Times between failures and repair times follow exponential distributions of means
+    mtbf and mttr minutes, rounded up to whole minutes. They are drawn with NumPy by
+    blocks of BLOCK_SIZE for each unit, the factory only looks at the next one due.
+    """
+
+    def __init__(self, seed=None):
+        self.random = numpy.random.RandomState(seed)
+        self.events = EventQueue()
+        self.draws = {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def start(self, factory):
+        for rank, pu in enumerate(factory.production_units):
+            if pu.config.get("mtbf"):
+                self.draws[pu] = {"mtbf": [None, 0], "mttr": [None, 0]}
+                self.events.push(factory.time + self.draw(pu, "mtbf"), rank, (pu, Failure))
+
+    def draw(self, pu, key):
+        block = self.draws[pu][key]
+        if block[0] is None or block[1] == len(block[0]):
+            minutes = numpy.ceil(self.random.exponential(pu.config[key], BLOCK_SIZE))
+            block[0], block[1] = numpy.maximum(minutes, 1).astype(int).tolist(), 0
+        block[1] += 1
+        return block[0][block[1] - 1]
+
+    def next_time(self):
+        return self.events.next_time()
+
+    def pop(self, time):
+        """Failure and Fix events due at time, the next ones are scheduled"""
+        due = []
+        for rank, (pu, event_class) in self.events.pop(time):
+            due.append(event_class(pu))
+            if event_class is Failure:
+                self.events.push(time + self.draw(pu, "mttr"), rank, (pu, Fix))
+            else:
+                self.events.push(time + self.draw(pu, "mtbf"), rank, (pu, Failure))
+        return due
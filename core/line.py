@@ -0,0 +1,51 @@
+import collections
+
+
+class LineGraph(object):
+    """Production units chained by stocking zones: a unit feeds the units whose inputs zone is its output zone.
+
+    order lists the units upstream first, in the order they were added when nothing
+    chains them. Units in a cycle come after the others, in the order they were added.
+    """
+
+    def __init__(self, production_units):
+        producers = {}
+        for pu in production_units:
+            producers.setdefault(id(pu.output_stocking_zone), []).append(pu)
+        self.upstream = {}
+        self.downstream = collections.defaultdict(list)
+        for pu in production_units:
+            feeding = [producer for producer in producers.get(id(pu.inputs_stocking_zone), []) if producer is not pu]
+            if feeding:
+                self.upstream[pu] = feeding
+                for producer in feeding:
+                    self.downstream[producer].append(pu)
+        self.order = self._sort(production_units)
+        self.position = dict((pu, i) for i, pu in enumerate(self.order))
+
+    def __nonzero__(self):
+        return bool(self.upstream)
+
+    def _sort(self, production_units):
+        indegree = dict((pu, len(self.upstream.get(pu, ()))) for pu in production_units)
+        ready = collections.deque(pu for pu in production_units if not indegree[pu])
+        order = []
+        while ready:
+            pu = ready.popleft()
+            order.append(pu)
+            for downstream in self.downstream.get(pu, ()):
+                indegree[downstream] -= 1
+                if not indegree[downstream]:
+                    ready.append(downstream)
+        if len(order) < len(production_units):
+            sorted_units = set(order)
+            order.extend(pu for pu in production_units if pu not in sorted_units)
+        return order
+
+    def is_fed(self, pu):
+        return pu in self.upstream
+
+    def get_fed_types(self, pu):
+        """Types of the materials made upstream of pu"""
+        return set(material.type for producer in self.upstream.get(pu, ()) if producer.spec
+                   for material in producer.spec.output_materials)
@@ -1,8 +1,21 @@
-from core.specification import MaterialInputConstraint
+# interned material types, their ids index the quantities of stocking zones
+material_types = {}
+material_type_names = []
+
+def get_type_id(type):
+    type_id = material_types.get(type)
+    if type_id is None:
+        type_id = material_types[type] = len(material_type_names)
+        material_type_names.append(type)
+    return type_id
+
 
 class Material(object):
+    __slots__ = ("type", "type_id", "quantity", "price")
+
     def __init__(self, type, quantity=1, price=1):
         self.type = type
+        self.type_id = get_type_id(type)
         self.quantity = quantity
         self.price = price
 
@@ -12,15 +25,17 @@ class Material(object):
     def __repr__(self):
         return self.__str__()
 
+    def __reduce__(self):
+        # type ids depend on the process, materials are pickled by type name
+        return Material, (self.type, self.quantity, self.price)
+
     def __add__(self, material):
         if material.type == self.type:
-	    return Material(self.type, self.quantity + material.quantity)
+            return Material(self.type, self.quantity + material.quantity, self.price)
         return self, material
 
     def __eq__(self, other):
         return self.type == other.type and self.quantity == other.quantity
 
     def consume(self, spec):
-        for constraint in spec.constraints:
-            if isinstance(constraint, MaterialInputConstraint) and constraint.material.type==self.type:
-                self.quantity -= constraint.material.quantity
+        self.quantity -= spec.compile().consumption.get(self.type_id, 0)
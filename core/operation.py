@@ -1,23 +1,54 @@
-import copy
 import logging
+from fractions import Fraction, gcd
 from core import Runnable
 from core.constraint import HasWorkerConstraint, InputValidForSpecConstraint
+from core.specification import SkillConstraint
 from core.event import IllegalStateToPerformAction, CannotPerformOperation, InvalidInputLoaded
 
 from core.production_unit import ProductionUnit, ProductionUnitSTARTEDState, ProductionUnitPRODUCINGState
 
 logger = logging.getLogger()
 
+NEVER = float("inf")
+
+# what a blocked operation waits for in a stocking zone
+SPACE, STOCK = "space", "stock"
+
+
+# rates are read as the closest fraction with at most this denominator
+MAX_DENOMINATOR = 10 ** 6
+_ratios = {}
+
+
+def get_ratio(value):
+    """(numerator, denominator) of value as an exact fraction, 1.0 / 3 is 1/3 and 0.1 is 1/10"""
+    ratio = _ratios.get(value)
+    if ratio is None:
+        fraction = Fraction(value).limit_denominator(MAX_DENOMINATOR)
+        ratio = _ratios[value] = (fraction.numerator, fraction.denominator)
+    return ratio
+
 
 class Operation(Runnable):
-    def __init__(self, production_unit=None, time_to_perform=1, worker=None):
+    """Work performed on a production unit, step by step until its progress reaches 1.
+
+    The progress is kept exactly as work / scale with integers, each step adds the
+    numerator of get_progress_ratio scaled to scale. Long runs do not drift and
+    ticks_until_complete tells in one division when the progress reaches 1.
+    """
+
+    def __init__(self, production_unit=None, time_to_perform=1, worker=None, crew_size=1):
         super(Operation, self).__init__()
         self.production_unit = production_unit
         self.constraints = []
         self.time_to_perform = time_to_perform
         self.elapsed_time = 0
-        self.progress = 0.0
+        self.work = 0
+        self.scale = 1
         self.worker = worker
+        # workers beyond the first one of a crew each perform one more step per minute
+        self.crew_size = crew_size
+        self.helpers = []
         self.time = 0
 
     def __eq__(self, other):
@@ -26,9 +57,33 @@ class Operation(Runnable):
                self.time_to_perform == other.time_to_perform and\
                self.worker == self.worker
 
+    @property
+    def progress(self):
+        return float(self.work) / self.scale
+
+    @progress.setter
+    def progress(self, value):
+        numerator, denominator = get_ratio(value)
+        self.rescale(denominator)
+        self.work = numerator * (self.scale // denominator)
+
+    def reset(self):
+        """Put the operation back in its initial state so that a protocol can hand it out again"""
+        self.work = 0
+        self.elapsed_time = 0
+        self.worker = None
+        self.helpers = []
+        self.time = 0
+
     def add_constraint(self, constraint):
         self.constraints.append(constraint)
 
+    def needs_worker(self):
+        return HasWorkerConstraint in getattr(self, "static_constraints", ())
+
+    def required_skills(self):
+        return [constraint.skill_name for constraint in self.constraints if isinstance(constraint, SkillConstraint)]
+
     def check_all(self):
         self.check_valid_state()
         if hasattr(self, "constraints"):
@@ -52,22 +107,27 @@ class Operation(Runnable):
         for constraint in self.static_constraints:
             constraint(self).validate(self.worker)
 
-    def run(self, during=1):
+    def run(self, during=1, event_driven=False):
         self.check_all()
-        super(Operation, self).run(during)
+        super(Operation, self).run(during, event_driven)
 
     def do_step(self):
 
         if self.is_operation_complete():
-            self.progress = 0
+            self.work = 0
 
         if self.operation_ready_to_be_performed():
 
-            if self.worker:
-                self.worker.add_unit_of_work()
+            if self.worker and not self.worker.add_unit_of_work():
+                return
 
-            self._do_step()
-            self.progress += self.get_progress_step()
+            # _do_step returns False when the operation could not move forward
+            if self._do_step() is not False:
+                self.work += self.get_work_step()
+                for helper in self.helpers:
+                    if self.is_operation_complete() or not helper.add_unit_of_work() or self._do_step() is False:
+                        break
+                    self.work += self.get_work_step()
 
         if self.is_operation_complete():
             self.on_operation_complete()
@@ -75,18 +135,82 @@ class Operation(Runnable):
     def on_operation_complete(self):
         pass
 
-    def get_progress_step(self):
-        return 1.0 / self.time_to_perform
+    def get_progress_ratio(self):
+        """(numerator, denominator) of the progress made by each step"""
+        return 1, self.time_to_perform
+
+    def get_work_step(self):
+        numerator, denominator = self.get_progress_ratio()
+        if denominator == self.scale:
+            return numerator
+        self.rescale(denominator)
+        return numerator * (self.scale // denominator)
+
+    def rescale(self, denominator):
+        """Count the work in a scale which denominator divides, keeping the progress"""
+        if not self.work:
+            self.scale = denominator
+        elif self.scale % denominator:
+            factor = denominator // gcd(self.scale, denominator)
+            self.work *= factor
+            self.scale *= factor
+
+    def ticks_until_complete(self):
+        """Steps before the progress equals 1, NEVER when it goes past 1"""
+        step = self.get_work_step()
+        remaining = self.scale - self.work
+        if remaining < 0 or step <= 0 or remaining % step:
+            return NEVER
+        return remaining // step
 
     def operation_ready_to_be_performed(self):
         return True
 
+    def is_progress_complete(self):
+        return self.work == self.scale
+
     def is_operation_complete(self):
-        return self.progress == 1
+        return self.work == self.scale
 
     def _do_step(self):
         pass
 
+    def quiet_steps(self):
+        if not self.operation_ready_to_be_performed():
+            return 0
+        # a crew does several steps per minute and may grow, it is stepped minute by minute
+        if self.crew_size > 1:
+            return 0
+        steps = self._quiet_steps()
+        if steps and self.worker:
+            steps = min(steps, self.worker.remaining_hours())
+        return steps
+
+    def skip(self, steps):
+        if self.worker:
+            self.worker.add_unit_of_work(steps)
+        self._skip_do_step(steps)
+        self._skip_progress(steps)
+
+    def waits_for(self, kind):
+        """Stocking zone in which the operation waits for room or for materials, None if it can go on"""
+        return None
+
+    def _quiet_steps(self):
+        return 0
+
+    def _skip_do_step(self, steps):
+        pass
+
+    def _skip_progress(self, steps):
+        self.work += steps * self.get_work_step()
+
+    def _steps_before_completion(self):
+        steps = self.ticks_until_complete()
+        if not steps:
+            return 0
+        return steps - 1
+
 class LoadOperation(Operation):
     valid_state = [ProductionUnit.IDLE, ProductionUnit.STARTED, ProductionUnit.PRODUCING]
     static_constraints = [HasWorkerConstraint, InputValidForSpecConstraint]
@@ -98,10 +222,32 @@ class LoadOperation(Operation):
         self.inputs = inputs
         super(LoadOperation, self).__init__(*args, **kwargs)
 
+    def get_loaded(self, work):
+        """Quantity loaded once the work is done, whole quantities load in whole parts"""
+        quantity = self.inputs.quantity
+        if work == self.scale:
+            return quantity
+        if isinstance(quantity, (int, long)):
+            return quantity * work // self.scale
+        return quantity * work / float(self.scale)
+
+    def _load(self, steps):
+        step = self.get_work_step()
+        quantity = self.get_loaded(self.work + steps * step) - self.get_loaded(self.work)
+        if quantity:
+            self.production_unit.load(self.inputs, quantity)
+
     def _do_step(self):
-        input = copy.copy(self.inputs)
-        input.quantity = self.inputs.quantity / self.time_to_perform
-        self.production_unit.load(input)
+        self._load(1)
+
+    def _quiet_steps(self):
+        # loading a float quantity at once would not round like step by step loading
+        if not isinstance(self.inputs.quantity, (int, long)):
+            return 0
+        return self._steps_before_completion()
+
+    def _skip_do_step(self, steps):
+        self._load(steps)
 
 
 class AllInOneLoadOperation(Operation):
@@ -113,8 +259,10 @@ class AllInOneLoadOperation(Operation):
         super(AllInOneLoadOperation, self).__init__(*args, **kwargs)
 
     def on_operation_complete(self):
-        input = copy.copy(self.inputs)
-        self.production_unit.load(input)
+        self.production_unit.load(self.inputs)
+
+    def _quiet_steps(self):
+        return self._steps_before_completion()
 
 
 class UnloadOperation(Operation):
@@ -127,10 +275,10 @@ class UnloadOperation(Operation):
 
     def _do_step(self):
         self.done = self.quantity * self.progress
-        self.zone.add_to_stock(self.production_unit.output_stocking_zone.stock.popitem()[1])
+        self.zone.add_to_stock(self.production_unit.output_stocking_zone.popitem())
 
     def operation_ready_to_be_performed(self):
-        return bool(self.production_unit.output_stocking_zone.stock)
+        return bool(self.production_unit.output_stocking_zone.count())
 
 def create_operation(class_name, action, valid_states):
     def _do_step(self):
@@ -144,49 +292,103 @@ StopOperation = create_operation("StopOperation","stop", [ProductionUnit.STARTED
 class ProduceOperation(Operation):
     valid_state = [ProductionUnit.STARTED, ProductionUnit.PRODUCING]
 
-    def get_progress_step(self):
-        return self.production_unit.rate
+    def get_progress_ratio(self):
+        return get_ratio(self.production_unit.rate)
 
     def _do_step(self):
-        if not self.progress:
-            self.progress += self.get_progress_step()
+        if not self.work:
+            self.work += self.get_work_step()
         if not self.production_unit.get_state() == ProductionUnit.PRODUCING:
             self.production_unit.set_state(ProductionUnitPRODUCINGState)
 
-        inputs = self.production_unit.inputs.get_flat_inputs()
         spec = self.production_unit.spec
-        if not spec.validate_all(inputs):
+        if not spec.validate_all(self.production_unit.inputs):
             self.production_unit.set_state(ProductionUnitSTARTEDState)
-            raise InvalidInputLoaded("Inputs %s does not match constraints %s" % (inputs, spec))
-        if self.progress == 1:
-            self.production_unit.produce()
-            self.progress = 0
+            if self.production_unit.signals is None:
+                raise InvalidInputLoaded("Inputs %s does not match constraints %s" %
+                                         (self.production_unit.inputs.get_flat_inputs(), spec))
+            self.production_unit.signals.emit(InvalidInputLoaded(self.production_unit))
+            return False
+        if self.is_progress_complete():
+            if not self.production_unit.produce():
+                return False
+            self.work = 0
 
     def on_operation_complete(self):
         logger.debug("Produce has completed a product")
 
+    def waits_for(self, kind):
+        pu = self.production_unit
+        if kind == SPACE and self.is_progress_complete() and pu.output_stocking_zone.is_full():
+            return pu.output_stocking_zone
+        if kind == STOCK and not pu.spec.validate_all(pu.inputs):
+            return pu.inputs_stocking_zone
+        return None
+
     def is_operation_complete(self):
         return not bool(self.production_unit.inputs_stocking_zone.count())
 
+    def _quiet_steps(self):
+        # steps which only make progress, until the next product is made
+        if not self.work or self.is_progress_complete() or self.is_operation_complete():
+            return 0
+        if not self.production_unit.get_state() == ProductionUnit.PRODUCING:
+            return 0
+        if not self.production_unit.spec.validate_all(self.production_unit.inputs):
+            return 0
+        steps = self.ticks_until_complete()
+        # the minute the product is due is stepped, a full stock blocks the unit then
+        if steps and self.production_unit.output_stocking_zone.size:
+            steps -= 1
+        return steps
+
 
 class Process(Operation):
+    """Operations performed one after the other, forever.
+
+    The operations form a ring walked by index. A cycle of the process completes when
+    its last operation becomes the current one.
+    """
+
     def __init__(self, production_unit, operations):
         super(Process, self).__init__(production_unit=production_unit)
         self.operations = operations
-        self.queue = self.operations[:]
-        self.current = self.queue.pop(0)
+        self.reset_ring()
+
+    def reset_ring(self):
+        self.index = 0
+        self.current = self.operations[0]
+        self.cycle_done = len(self.operations) == 1
 
     def _do_step(self):
         logger.debug("Process: Current operation: %s" % self.current)
         self.current.do_step()
         if self.current.is_operation_complete():
-            self.current = self.queue.pop(0)
+            self.index += 1
+            if self.index == len(self.operations):
+                self.index = 0
+            self.current = self.operations[self.index]
+            self.cycle_done = self.index == len(self.operations) - 1
 
     def is_operation_complete(self):
-        return not bool(self.queue)
+        return self.cycle_done
+
+    def reset(self):
+        super(Process, self).reset()
+        for operation in self.operations:
+            operation.reset()
+        self.reset_ring()
 
     def on_operation_complete(self):
-        self.queue.extend(self.operations[:])
+        self.cycle_done = False
+
+    def _quiet_steps(self):
+        if self.is_operation_complete():
+            return 0
+        return self.current.quiet_steps()
+
+    def _skip_do_step(self, steps):
+        self.current.skip(steps)
 
 class ParallelProcess(Operation):
     def __init__(self, process_list):
@@ -197,3 +399,116 @@ class ParallelProcess(Operation):
         for process in self.processes:
             logger.debug("Running parallel process %s" % process)
             process.do_step()
+
+    def _quiet_steps(self):
+        return min([process.quiet_steps() for process in self.processes] or [0])
+
+    def _skip_do_step(self, steps):
+        for process in self.processes:
+            process.skip(steps)
+
+    def _skip_progress(self, steps):
+        # the progress starts over on every step
+        self.work = self.get_work_step()
+
+
+def stocked(zone, quantity):
+    """Condition of an OperationGraph: zone holds at least quantity"""
+    return lambda: zone.count() >= quantity
+
+
+class OperationGraph(Operation):
+    """Operations performed once per cycle, each after the operations it depends on.
+
+    Operations are added after their dependencies, so the graph has no cycle and
+    keeps them in an order in which they can run. An operation runs from the step
+    after all its dependencies completed in the current cycle, and while the
+    conditions it is given with when, callables without argument, are true:
+
+        graph.add(load)
+        graph.add(produce, after=[load])
+        graph.add(unload, after=[produce], when=[stocked(zone, 10)])
+
+    Only the operations whose dependencies are done are looked at on each step. The
+    cycle completes when all the operations have completed, the next one starts over.
+    """
+
+    def __init__(self, production_unit=None):
+        super(OperationGraph, self).__init__(production_unit=production_unit)
+        self.operations = []
+        self.dependents = {}
+        self.dependencies = {}
+        self.conditions = {}
+        self.position = {}
+        self.reset_cycle()
+
+    def add(self, operation, after=(), when=()):
+        for dependency in after:
+            if dependency not in self.position:
+                raise ValueError("%s has to be added before the operations depending on it" % dependency)
+        self.position[operation] = len(self.operations)
+        self.operations.append(operation)
+        self.dependents[operation] = []
+        self.dependencies[operation] = len(after)
+        self.conditions[operation] = list(when)
+        for dependency in after:
+            self.dependents[dependency].append(operation)
+        self.reset_cycle()
+        return operation
+
+    def reset_cycle(self):
+        self.waiting = dict(self.dependencies)
+        self.runnable = [operation for operation in self.operations if not self.waiting[operation]]
+        self.remaining = len(self.operations)
+
+    def reset(self):
+        super(OperationGraph, self).reset()
+        for operation in self.operations:
+            operation.reset()
+        self.reset_cycle()
+
+    def is_runnable(self, operation):
+        for condition in self.conditions[operation]:
+            if not condition():
+                return False
+        return True
+
+    def _do_step(self):
+        completed = []
+        for operation in self.runnable:
+            if self.conditions[operation] and not self.is_runnable(operation):
+                continue
+            operation.do_step()
+            if operation.is_operation_complete():
+                completed.append(operation)
+        if completed:
+            self.complete(completed)
+
+    def complete(self, completed):
+        # dependents of the completed operations may run from the next step, operations are
+        # told apart by identity since equal operations may be different steps of the graph
+        done = set(id(operation) for operation in completed)
+        self.runnable = [operation for operation in self.runnable if id(operation) not in done]
+        for operation in completed:
+            self.remaining -= 1
+            for dependent in self.dependents[operation]:
+                self.waiting[dependent] -= 1
+                if not self.waiting[dependent]:
+                    self.runnable.append(dependent)
+        self.runnable.sort(key=self.position.get)
+
+    def is_operation_complete(self):
+        return bool(self.operations) and not self.remaining
+
+    def on_operation_complete(self):
+        self.reset_cycle()
+
+    def _quiet_steps(self):
+        # a condition may change with any step of another operation
+        if not self.runnable or any(self.conditions[operation] for operation in self.operations):
+            return 0
+        return min(operation.quiet_steps() for operation in self.runnable)
+
+    def _skip_do_step(self, steps):
+        for operation in self.runnable:
+            operation.skip(steps)
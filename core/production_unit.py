@@ -1,8 +1,11 @@
+import array
 import collections
 import logging
 from core import Entity
+from core.material import Material, get_type_id, material_types, material_type_names
 
 from core.event import StockIsFull
+from core.specification import SkillConstraint
 
 logger = logging.getLogger()
 
@@ -21,30 +24,107 @@ class SignalDescriptor(object):
     def __delete__(self, instance):
         del(instance._value)
 
+class ProtocolStep(object):
+    """One step of a protocol: an operation class, its arguments and the operation reused on every cycle"""
+
+    def __init__(self, operation_class, **kwargs):
+        self.operation_class = operation_class
+        self.kwargs = kwargs
+        self.constraints = []
+        self.operation = None
+
+    def add_constraint(self, constraint):
+        self.constraints.append(constraint)
+        self.operation = None
+
+    def override(self, **kwargs):
+        self.kwargs.update(kwargs)
+        self.operation = None
+
+    def get_operation(self, machine):
+        if self.operation is None:
+            self.operation = self.operation_class(production_unit=machine, **self.kwargs)
+            for constraint in self.constraints:
+                self.operation.add_constraint(constraint)
+        else:
+            self.operation.reset()
+        return self.operation
+
+
 class Protocol(object):
+    """Operations performed by a production unit: the prologue once, then the cycle forever.
+
+    Each step reuses its operation every time it is handed out. Steps of the cycle
+    can be inserted, moved, removed or overridden while the unit runs: an inserted
+    step and an overridden one build a new operation the next time they are handed
+    out. The next step handed out stays the same unless it is removed.
+    """
+
     def __init__(self, machine):
-        self._protocol_index = 0
         self.machine = machine
-        self._protocol =  self.create_protocol()
+        self.prologue, self.cycle = self.create_protocol()
+        self._prologue_index = 0
+        self._cycle_index = 0
 
     def create_protocol(self):
         from core.operation import StartOperation, LoadOperation, ProduceOperation
-        protocol_list = [(StartOperation, {})]
         inputs = self.machine.spec.get_inputs() if self.machine.spec else []
-        for input in inputs:
-            protocol_list.append((LoadOperation, {"inputs":input}))
-        protocol_list.append((ProduceOperation, {}))
-        return protocol_list
+        # a crew of several workers loads the unit faster
+        load_time = self.machine.config.get("load_time", 1)
+        crew_size = self.machine.config.get("crew", 1)
+        cycle = [ProtocolStep(LoadOperation, inputs=input, time_to_perform=load_time, crew_size=crew_size)
+                 for input in inputs]
+        # skills of the unit are required from the workers loading it
+        for skill in self.machine.config.get("skills", []):
+            for step in cycle:
+                step.add_constraint(SkillConstraint(skill))
+        cycle.append(ProtocolStep(ProduceOperation))
+        return [ProtocolStep(StartOperation)], cycle
 
     def next(self):
-        if self._protocol_index < len(self._protocol):
-            index = self._protocol_index
+        if self._prologue_index < len(self.prologue):
+            step = self.prologue[self._prologue_index]
+            self._prologue_index += 1
         else:
-            index = (self._protocol_index - len(self._protocol)) % (len(self._protocol) -1) + 1
-        protocol_tuple = self._protocol[index]
-        protocol = protocol_tuple[0](production_unit=self.machine, **protocol_tuple[1])
-        self._protocol_index += 1
-        return protocol
+            step = self.cycle[self._cycle_index]
+            self._cycle_index += 1
+            if self._cycle_index == len(self.cycle):
+                self._cycle_index = 0
+        return step.get_operation(self.machine)
+
+    def in_prologue(self):
+        """Whether steps of the prologue are still to be handed out"""
+        return self._prologue_index < len(self.prologue)
+
+    def insert(self, index, operation_class, **kwargs):
+        self.cycle.insert(index, ProtocolStep(operation_class, **kwargs))
+        if index < self._cycle_index:
+            self._cycle_index += 1
+
+    def move(self, index, new_index):
+        upcoming = self.cycle[self._cycle_index]
+        self.cycle.insert(new_index, self.cycle.pop(index))
+        self._cycle_index = self.cycle.index(upcoming)
+
+    def remove(self, index):
+        if len(self.cycle) == 1:
+            raise ValueError("The cycle of a protocol needs at least one step")
+        del self.cycle[index]
+        if index < self._cycle_index:
+            self._cycle_index -= 1
+        elif self._cycle_index == len(self.cycle):
+            self._cycle_index = 0
+
+    def override(self, index, **kwargs):
+        self.cycle[index].override(**kwargs)
+
+    def feed(self, types):
+        """Stop loading the materials of types, production units upstream make them"""
+        from core.operation import LoadOperation
+        for index in reversed(range(len(self.cycle))):
+            step = self.cycle[index]
+            if step.operation_class is LoadOperation and step.kwargs["inputs"].type in types:
+                self.remove(index)
 
 
 class ProductionUnit(Entity):
@@ -62,7 +142,10 @@ class ProductionUnit(Entity):
         self.set_state(ProductionUnitIDLEState)
         self.protocol = Protocol(self)
         self.name = name
+        # name of the production line of the unit, if any
+        self.line = None
         self.unit_produced = 0
+        self.value_produced = 0
 
     def initialize(self):
         self.rate = self.config.get("rate_by_minute", 1)
@@ -83,16 +166,20 @@ class ProductionUnit(Entity):
     def set_state(self, state_class):
         self.state = state_class(self)
 
-    def load(self, input):
-        self.inputs_stocking_zone.add_to_stock(input)
+    def load(self, input, quantity=None):
+        if quantity is None:
+            quantity = input.quantity
+        self.inputs_stocking_zone.add_quantity(input, quantity)
 
     def produce(self):
-        for input in self.inputs_stocking_zone:
-            input.consume(self.spec)
-            if not input.quantity:
-                self.inputs.remove(input)
+        if self.signals is not None and self.output_stocking_zone and self.output_stocking_zone.is_full():
+            self.signals.emit(StockIsFull(self))
+            return False
+        self.inputs_stocking_zone.consume(self.spec)
         self.set_output(self.spec.output_materials)
         self.unit_produced += 1
+        self.value_produced += self.spec.compile().output_value
+        return True
 
     def get_outputs(self):
         return self.outputs
@@ -146,39 +233,148 @@ class ProductionUnitFAILUREState(ProductionUnitState):
     STATUS = ProductionUnit.FAILURE
 
 
-class StockingZone():
+class StockingZone(object):
+    """Quantities of materials, stored in an array indexed by material type id"""
+
     def __init__(self, size=None):
-        self.stock = {}
         self.size = size # None means unlimited
+        self.quantities = array.array("d")
+        self.prices = {}
+        self._stocked = set()
+        self._count = 0
+        self.version = 0
+        # callbacks waiting for the next change of the zone, see notify
+        self.listeners = []
+        # (version, result) of the compiled specifications validated against the zone
+        self.validations = {}
+
+    def __getstate__(self):
+        # type ids depend on the process, quantities are pickled by type name
+        state = self.__dict__.copy()
+        state["quantities"] = dict((material_type_names[type_id], self.quantities[type_id]) for type_id in self._stocked)
+        state["prices"] = dict((material_type_names[type_id], price) for type_id, price in self.prices.items())
+        del state["_stocked"]
+        state["validations"] = {}
+        return state
+
+    def __setstate__(self, state):
+        quantities, prices = state.pop("quantities"), state.pop("prices")
+        self.__dict__.update(state)
+        self.quantities = array.array("d")
+        self._stocked = set()
+        self.prices = dict((get_type_id(type), price) for type, price in prices.items())
+        for type, quantity in quantities.items():
+            type_id = get_type_id(type)
+            if type_id >= len(self.quantities):
+                self.quantities.extend([0.0] * (type_id + 1 - len(self.quantities)))
+            self.quantities[type_id] = quantity
+            self._stocked.add(type_id)
+
+    @property
+    def stock(self):
+        return dict((material.type, material) for material in self.get_flat_inputs())
 
     def count(self):
-        return sum([material.quantity for material in self.stock.values()])
+        return self._count
+
+    def quantity(self, type):
+        type_id = material_types.get(type)
+        if type_id is None or type_id >= len(self.quantities):
+            return 0
+        return self.quantities[type_id]
+
+    def quantity_by_id(self, type_id):
+        if type_id >= len(self.quantities):
+            return 0
+        return self.quantities[type_id]
+
+    def free_space(self):
+        """Room left before the stock is full, None when unlimited"""
+        if not self.size:
+            return None
+        return max(self.size - self._count, 0)
+
+    def is_full(self):
+        return bool(self.size) and self._count >= self.size
 
     def add_to_stock(self, elements):
-        if self.size and self.count() >= self.size:
+        if self.is_full():
             raise StockIsFull()
         if not isinstance(elements, collections.Iterable):
             elements = [elements]
         for element in elements:
-            if not element.quantity:
-                logger.warning("Try to add empty element of type %s" % element.type)
-            if element.type not in self.stock:
-                self.stock[element.type] = element
-            else:
-                self.stock[element.type] += element
-        logger.debug("Add elements to the stock. Stock(%d/%s)", self.count(), self.size if self.size else "unlimited")
+            self._put(element, element.quantity)
+        logger.debug("Add elements to the stock. Stock(%d/%s)", self._count, self.size if self.size else "unlimited")
+
+    def add_quantity(self, material, quantity):
+        """Stock quantity of the type of material, without creating a new material"""
+        if self.is_full():
+            raise StockIsFull()
+        self._put(material, quantity)
+
+    def _put(self, material, quantity):
+        if not quantity:
+            logger.warning("Try to add empty element of type %s" % material.type)
+        type_id = material.type_id
+        if type_id >= len(self.quantities):
+            self.quantities.extend([0.0] * (type_id + 1 - len(self.quantities)))
+        self.quantities[type_id] += quantity
+        self._count += quantity
+        self.version += 1
+        if self.listeners:
+            self.notify()
+        if self.quantities[type_id]:
+            self._stocked.add(type_id)
+            self.prices.setdefault(type_id, material.price)
 
     def add_zone(self, zone):
         pass
 
     def remove(self, element):
-        if self.stock[element.type].quantity > element.quantity:
-            self.stock[element.type] -= element.quantity
+        self.withdraw(element.type_id, element.quantity)
+
+    def withdraw(self, type_id, quantity):
+        self.version += 1
+        stocked = self.quantities[type_id]
+        if stocked > quantity:
+            self.quantities[type_id] = stocked - quantity
+            self._count -= quantity
         else:
-            del self.stock[element.type]
+            self.quantities[type_id] = 0
+            self._count -= stocked
+            self._stocked.discard(type_id)
+        if self.listeners:
+            self.notify()
+
+    def popitem(self):
+        type_id = self._stocked.pop()
+        self.version += 1
+        material = self._get_material(type_id)
+        self.quantities[type_id] = 0
+        self._count -= material.quantity
+        if self.listeners:
+            self.notify()
+        return material
+
+    def listen(self, callback):
+        """Call callback with the zone at its next change"""
+        self.listeners.append(callback)
+
+    def notify(self):
+        listeners, self.listeners = self.listeners, []
+        for callback in listeners:
+            callback(self)
+
+    def consume(self, spec):
+        for type_id, quantity in spec.compile().consumption.iteritems():
+            if type_id in self._stocked:
+                self.withdraw(type_id, quantity)
+
+    def _get_material(self, type_id):
+        return Material(material_type_names[type_id], self.quantities[type_id], self.prices[type_id])
 
     def __iter__(self):
-        return self.stock.values().__iter__()
+        return iter(self.get_flat_inputs())
 
     def get_flat_inputs(self):
-        return self.stock.values()
\ No newline at end of file
+        return [self._get_material(type_id) for type_id in self._stocked]
\ No newline at end of file
@@ -0,0 +1,53 @@
+import json
+import time
+from core import Runnable
+
+PHASES = ("check", "step", "completion", "skip")
+
+
+class Profiler(object):
+    """Calls and cumulative wall time of operations by phase.
+
+    Times are recorded both for the class of the operation and for its production
+    unit. A Factory only goes through a profiler once enable_profiling is called.
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self.operations = {}
+        self.production_units = {}
+
+    def call(self, phase, operation, function, *args):
+        start = self.timer()
+        try:
+            return function(*args)
+        finally:
+            self.record(phase, operation, self.timer() - start)
+
+    def run(self, operation, during=1):
+        """Same as operation.run, with its checks and its steps timed apart"""
+        self.call("check", operation, operation.check_all)
+        self.call("step", operation, Runnable.run, operation, during)
+
+    def record(self, phase, operation, elapsed):
+        keys = [(self.operations, type(operation).__name__)]
+        if operation.production_unit is not None:
+            keys.append((self.production_units, operation.production_unit.name))
+        for stats, key in keys:
+            calls_and_time = stats.setdefault(key, {}).setdefault(phase, [0, 0.0])
+            calls_and_time[0] += 1
+            calls_and_time[1] += elapsed
+
+    def reset(self):
+        self.operations.clear()
+        self.production_units.clear()
+
+    def as_dict(self):
+        def format(stats):
+            return dict((key, dict((phase, {"calls": calls, "seconds": seconds})
+                                   for phase, (calls, seconds) in phases.items()))
+                        for key, phases in stats.items())
+        return {"operations": format(self.operations), "production_units": format(self.production_units)}
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
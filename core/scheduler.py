@@ -0,0 +1,181 @@
+import collections
+import heapq
+
+
+class EventQueue(object):
+    """Priority queue of the next time each runnable has something to do.
+
+    Entries due at the same time come out ordered by rank, which lets the factory
+    keep the order in which the tick engine would have stepped its operations.
+    """
+
+    def __init__(self):
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, time, rank, item):
+        heapq.heappush(self._heap, (time, rank, item))
+
+    def next_time(self):
+        return self._heap[0][0]
+
+    def pop(self, time):
+        due = []
+        while self._heap and self._heap[0][0] <= time:
+            event_time, rank, item = heapq.heappop(self._heap)
+            due.append((rank, item))
+        return due
+
+
+def last_released(worker, order):
+    """The worker released last goes first, like a stack of available workers"""
+    return -order
+
+
+def least_loaded(worker, order):
+    return worker.hour_worked, order
+
+
+def earliest_shift_end(worker, order):
+    return worker.remaining_hours(), order
+
+
+def specialist_first(worker, order):
+    """Workers with fewer skills go first, which keeps the versatile ones available"""
+    return len(worker.skills), worker.hour_worked, order
+
+
+# stale entries a heap of the pool may hold beyond twice the free workers
+COMPACTION_SLACK = 16
+
+
+class WorkerPool(object):
+    """Free workers in priority heaps, one for any operation and one per skill.
+
+    The policy gives the priority of a worker when it is released, the lowest goes
+    first, and skills are indexed at the same time. Heaps are cleaned lazily: an
+    entry is only valid while its worker is free and has not been released again
+    since. A heap holding more than twice as many entries as free workers is
+    compacted, so stale entries do not pile up in the heaps which are not popped.
+    An operation which needs a worker and finds none waits in a queue, and the next
+    worker released with its skills is kept for it. Workers with a shift calendar
+    rest between their shifts.
+    """
+
+    def __init__(self, policy=last_released):
+        self.policy = policy
+        self.any = []
+        self.by_skill = {}
+        self.free = {}
+        self.busy = set()
+        self.resting = set()
+        self.waiting = collections.OrderedDict()
+        self.reserved = {}
+        self.released = 0
+
+    def __len__(self):
+        return len(self.free)
+
+    def get_free_workers(self):
+        return [worker for order, worker in sorted((order, worker) for worker, order in self.free.items())]
+
+    def add(self, worker):
+        self.release(worker)
+
+    def release(self, worker):
+        self.busy.discard(worker)
+        self.resting.discard(worker)
+        if worker.remaining_hours() <= 0:
+            if worker.calendar is not None:
+                self.resting.add(worker)
+            return
+        if self.waiting:
+            for operation, skills in self.waiting.items():
+                if skills.issubset(worker.skills):
+                    del self.waiting[operation]
+                    self.reserved[operation] = worker
+                    self.busy.add(worker)
+                    return
+        order = self.released
+        self.released += 1
+        self.free[worker] = order
+        entry = (self.policy(worker, order), order, worker)
+        heapq.heappush(self.any, entry)
+        if len(self.any) > 2 * len(self.free) + COMPACTION_SLACK:
+            self._compact(self.any)
+        for skill in worker.skills:
+            heap = self.by_skill.setdefault(skill, [])
+            heapq.heappush(heap, entry)
+            if len(heap) > 2 * len(self.free) + COMPACTION_SLACK:
+                self._compact(heap)
+
+    def _compact(self, heap):
+        heap[:] = [entry for entry in heap if self.free.get(entry[2]) == entry[1]]
+        heapq.heapify(heap)
+
+    def retire(self, worker):
+        """Forget a worker whose day of work is over, until its next shift if it has a calendar"""
+        self.busy.discard(worker)
+        self.free.pop(worker, None)
+        if worker.calendar is not None:
+            self.resting.add(worker)
+
+    def acquire(self, operation, wait=True):
+        """A worker for operation, None when the operation has to go on without worker or wait.
+
+        With wait=False the operation does not queue for the next worker released.
+        """
+        worker = self.reserved.pop(operation, None) if self.reserved else None
+        if worker is None and self.free:
+            worker = self._pop(operation.required_skills())
+        if worker is None:
+            if wait and operation.needs_worker() and operation not in self.waiting:
+                self.waiting[operation] = set(operation.required_skills())
+            return None
+        if self.waiting:
+            self.waiting.pop(operation, None)
+        self.busy.add(worker)
+        return worker
+
+    def _pop(self, skills):
+        if skills:
+            skills = set(skills)
+            # the rarest skill has the smallest heap to look into
+            heap = min([self.by_skill.get(skill, []) for skill in skills], key=len)
+        else:
+            heap = self.any
+        free = self.free
+        skipped = []
+        worker = None
+        while heap:
+            entry = heapq.heappop(heap)
+            key, order, candidate = entry
+            if free.get(candidate) != order:
+                continue
+            if candidate.remaining_hours() <= 0:
+                del free[candidate]
+                continue
+            if not skills or skills.issubset(candidate.skills):
+                worker = candidate
+                del free[candidate]
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return worker
+
+    def can_staff_later(self, operation):
+        """Whether a busy or resting worker with the skills of operation still has hours to work"""
+        if operation in self.reserved:
+            return True
+        skills = set(operation.required_skills())
+        if not skills:
+            # a busy worker without hours left is retired by the factory at its next step
+            return bool(self.busy or self.resting)
+        return any(skills.issubset(worker.skills) for workers in (self.busy, self.resting) for worker in workers)
+
+
+POLICIES = {"last_released": last_released, "least_loaded": least_loaded,
+            "earliest_shift_end": earliest_shift_end, "specialist_first": specialist_first}
@@ -0,0 +1,72 @@
+HOUR = 60
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+
+class ShiftCalendar(object):
+    """Working intervals of a worker in minutes, repeated every period.
+
+    Time 0 is the start of the period, a Monday at midnight for weekly calendars.
+    Intervals may run over the end of the period, like a night shift, and touching
+    intervals are merged. ShiftCalendar.weekly builds the usual patterns:
+
+        ShiftCalendar.weekly(start=22 * HOUR, length=8 * HOUR, breaks=[(4 * HOUR, 30)], days_off=[5, 6])
+    """
+
+    def __init__(self, intervals, period=DAY):
+        self.period = period
+        self.intervals = self._merge(intervals)
+
+    @classmethod
+    def weekly(cls, start, length, breaks=(), days_off=()):
+        """Shift of length minutes from start minutes after midnight, every day but days_off (0 is Monday).
+
+        breaks are (minutes after the start of the shift, length in minutes).
+        """
+        intervals = []
+        for day in range(7):
+            if day in days_off:
+                continue
+            begin = day * DAY + start
+            for offset, pause in sorted(breaks):
+                intervals.append((begin, day * DAY + start + offset))
+                begin = day * DAY + start + offset + pause
+            intervals.append((begin, day * DAY + start + length))
+        return cls(intervals, WEEK)
+
+    def _merge(self, intervals):
+        merged = []
+        for start, end in sorted((start % self.period, start % self.period + end - start)
+                                 for start, end in intervals if end > start):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        # an interval running over the end of the period may join the first one
+        if len(merged) > 1 and merged[-1][1] >= merged[0][0] + self.period:
+            first = merged.pop(0)
+            merged[-1] = (merged[-1][0], max(merged[-1][1], first[1] + self.period))
+        if merged and merged[-1][1] - merged[-1][0] >= self.period:
+            merged = [(0, float("inf"))]
+        return merged
+
+    def _occurrences(self, time):
+        """Intervals in absolute time of the periods around time"""
+        cycle = time // self.period
+        for k in (cycle - 1, cycle, cycle + 1):
+            for start, end in self.intervals:
+                yield k * self.period + start, k * self.period + end
+
+    def get_interval(self, time):
+        """(start, end) of the working interval at time, None when off"""
+        for start, end in self._occurrences(time):
+            if start <= time < end:
+                return start, end
+        return None
+
+    def next_change(self, time):
+        """First time after time at which the worker starts or stops working"""
+        interval = self.get_interval(time)
+        if interval:
+            return interval[1]
+        return min([start for start, end in self._occurrences(time) if start > time] or [float("inf")])
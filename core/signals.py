@@ -0,0 +1,29 @@
+import collections
+
+
+class SignalBus(object):
+    """Collects the events emitted by entities and dispatches them when drained.
+
+    Subscribers are registered for an event class and receive its subclasses too.
+    Every event first reacts on its entity, which is how Failure and Fix act.
+    """
+
+    def __init__(self):
+        self.pending = collections.deque()
+        self.subscribers = {}
+
+    def subscribe(self, event_class, callback):
+        self.subscribers.setdefault(event_class, []).append(callback)
+
+    def emit(self, event):
+        self.pending.append(event)
+
+    def drain(self):
+        while self.pending:
+            self.dispatch(self.pending.popleft())
+
+    def dispatch(self, event):
+        event.react(event.entity)
+        for event_class in type(event).__mro__:
+            for callback in self.subscribers.get(event_class, ()):
+                callback(event)
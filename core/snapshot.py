@@ -0,0 +1,35 @@
+"""Snapshots of the whole state of a factory, to warm start what-if runs.
+
+A snapshot is the compressed pickle of the factory with its production units,
+workers, stocks and current operations. Restoring it registers new entities in
+the current registry, so a snapshot can be restored many times, in a Simulation or
+in another process:
+
+    warm_up = snapshot(factory)
+    for scenario in fork(warm_up, 50):
+        ...
+"""
+import copy_reg
+import cPickle
+import types
+import zlib
+
+
+def _reduce_method(method):
+    return getattr, (method.im_self, method.im_func.__name__)
+
+# signal subscribers are bound methods of the factory
+copy_reg.pickle(types.MethodType, _reduce_method)
+
+
+def snapshot(factory):
+    return zlib.compress(cPickle.dumps(factory, cPickle.HIGHEST_PROTOCOL))
+
+
+def restore(data):
+    return cPickle.loads(zlib.decompress(data))
+
+
+def fork(data, count=1):
+    """count independent factories restored from the same snapshot"""
+    return [restore(data) for i in range(count)]
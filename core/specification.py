@@ -1,16 +1,42 @@
 import collections
 
+class FrozenSpecification(Exception):pass
+
+
 class Specification(object):
 
     def __init__(self):
         self.constraints = []
         self.output_materials = []
+        self._compiled = None
+        self.frozen = False
+
+    def freeze(self):
+        """Forbid changes, for a specification shared by many production units"""
+        self.frozen = True
+        return self
 
     def add(self, constraint):
+        if self.frozen:
+            raise FrozenSpecification("Cannot add %s to a frozen specification" % constraint)
         self.constraints.append(constraint)
+        self._compiled = None
+
+    def compile(self):
+        if self._compiled is None:
+            self._compiled = CompiledSpecification(self)
+        return self._compiled
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_compiled"] = None
+        return state
 
     def add_output_material(self, output_spec):
+        if self.frozen:
+            raise FrozenSpecification("Cannot add %s to a frozen specification" % output_spec)
         self.output_materials.append(output_spec)
+        self._compiled = None
 
     def __str__(self):
         return "\n".join(map(lambda x: x.__str__(), self.constraints))
@@ -19,6 +45,8 @@ class Specification(object):
         return self.__str__()
 
     def validate_all(self, inputs):
+        if hasattr(inputs, "quantities"):
+            return self.compile().validate_all(inputs)
         if not inputs:
             return False
         return all(constraint.validate(inputs) for constraint in self.constraints)
@@ -31,6 +59,47 @@ class Specification(object):
     def get_inputs(self):
         return [constraint.material for constraint in self.constraints if isinstance(constraint, MaterialInputConstraint)]
 
+class CompiledSpecification(object):
+    """Material requirements of a specification indexed by material type id.
+
+    Validating a stocking zone is a single pass over the requirements. The result is
+    kept by the zone until its content changes: a frozen specification is shared by
+    the factories built from the same blueprint, which may run on other threads.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.requirements = []
+        self.consumption = {}
+        for constraint in spec.constraints:
+            if isinstance(constraint, MaterialInputConstraint):
+                type_id, quantity = constraint.material.type_id, constraint.material.quantity
+                self.requirements.append((type_id, quantity))
+                self.consumption[type_id] = self.consumption.get(type_id, 0) + quantity
+        self.other_constraints = [constraint for constraint in spec.constraints
+                                  if not isinstance(constraint, MaterialInputConstraint)]
+        self.output_value = sum([material.price for material in spec.output_materials])
+
+    def validate_all(self, zone):
+        version, valid = zone.validations.get(self, (None, None))
+        if version == zone.version:
+            return valid
+        valid = self._validate_all(zone)
+        zone.validations[self] = (zone.version, valid)
+        return valid
+
+    def _validate_all(self, zone):
+        if not zone.count():
+            return False
+        for type_id, quantity in self.requirements:
+            if zone.quantity_by_id(type_id) < quantity:
+                return False
+        if self.other_constraints:
+            inputs = zone.get_flat_inputs()
+            return all(constraint.validate(inputs) for constraint in self.other_constraints)
+        return True
+
+
 class InputConstraint(object):
 
     def __str__(self):
@@ -3,11 +3,13 @@ from core.event import DayOfWorkIsOver
 
 class Worker(Entity):
 
-    def __init__(self, working_hour = 8 * 60):
+    def __init__(self, working_hour = 8 * 60, calendar=None):
         super(Worker, self).__init__()
         self.skills = []
         self.working_hour = working_hour
         self._hour_worked = 0
+        # a worker with a ShiftCalendar works during its shifts, started and ended by the factory
+        self.calendar = calendar
 
     @property
     def hour_worked(self):
@@ -19,6 +21,18 @@ class Worker(Entity):
             raise DayOfWorkIsOver(self)
         self._hour_worked = value
 
-    def add_unit_of_work(self):
-        self.hour_worked += 1
-	
+    def add_unit_of_work(self, units=1):
+        if self.signals is not None and self._hour_worked + units > self.working_hour:
+            self.signals.emit(DayOfWorkIsOver(self))
+            return False
+        self.hour_worked += units
+        return True
+
+    def remaining_hours(self):
+        return self.working_hour - self._hour_worked
+
+    def start_shift(self, minutes):
+        self.working_hour = self._hour_worked + minutes
+
+    def end_shift(self):
+        self.working_hour = self._hour_worked
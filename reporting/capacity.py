@@ -0,0 +1,179 @@
+"""Steady-state capacity of a factory computed from its production units, without simulating.
+
+Each production unit repeats the cycle of its protocol: loads of time_to_perform
+minutes, done by a worker, then one produce step per product, a product taking the
+minutes its rate needs to reach 1. A unit alone makes products_per_cycle products
+every cycle_time minutes, its capacity, while it is not broken down. The throughput is the capacity reduced by
+
+- workers: the load minutes asked for by all units are shared by the workers
+- supply: a unit fed by others makes no more than they feed it
+- stock: a unit whose bounded stock feeds others makes no more than they take
+
+The bottleneck is the workers when they are short, otherwise the slowest unit
+running at its own capacity. Over a horizon, workers whose day of work is over stop
+the loads, every operation holding a worker when one is free.
+"""
+import math
+from core.event import NoWorkerToPerformAction
+from core.line import LineGraph
+from core.operation import LoadOperation, ProduceOperation, get_ratio
+from core.snapshot import snapshot, restore
+
+
+def get_product_steps(rate):
+    """Minutes to make a product at rate, None when the progress never reaches 1"""
+    if rate <= 0:
+        return None
+    step, scale = get_ratio(rate)
+    return None if scale % step else scale // step
+
+
+def get_needs(pu):
+    needs = {}
+    for material in pu.spec.get_inputs() if pu.spec else []:
+        needs[material.type] = needs.get(material.type, 0) + material.quantity
+    return needs
+
+
+def get_outputs(pu):
+    outputs = {}
+    for material in pu.spec.output_materials if pu.spec else []:
+        outputs[material.type] = outputs.get(material.type, 0) + material.quantity
+    return outputs
+
+
+def get_cycle(pu, fed_types):
+    """(cycle_time, products_per_cycle, load_minutes) of the protocol of pu"""
+    minutes = load_minutes = 0
+    loaded = {}
+    for step in pu.protocol.cycle:
+        if issubclass(step.operation_class, ProduceOperation):
+            continue
+        step_minutes = step.kwargs.get("time_to_perform", 1)
+        if issubclass(step.operation_class, LoadOperation):
+            material = step.kwargs["inputs"]
+            if material.type in fed_types:
+                # Factory stops loading what upstream units make, see Protocol.feed
+                continue
+            step_minutes = int(math.ceil(float(step_minutes) / step.kwargs.get("crew_size", 1)))
+            loaded[material.type] = loaded.get(material.type, 0) + material.quantity
+            load_minutes += step_minutes
+        minutes += step_minutes
+    needs = dict((type, quantity) for type, quantity in get_needs(pu).items() if type not in fed_types)
+    if not get_needs(pu):
+        products = 0
+    elif needs:
+        products = min(float(loaded.get(type, 0)) / quantity for type, quantity in needs.items())
+    else:
+        # fed units only produce, one product for each batch of inputs fed
+        products = 1
+    steps = get_product_steps(pu.rate)
+    if steps is None:
+        products = 0
+    return minutes + products * (steps or 0), products, load_minutes
+
+
+def get_availability(pu):
+    """Share of the time pu works between its failures, see core.failure.Breakdowns"""
+    mtbf = pu.config.get("mtbf")
+    return float(mtbf) / (mtbf + pu.config["mttr"]) if mtbf else 1.0
+
+
+def get_worker_minutes(factory, horizon):
+    """Minutes the workers of factory can work during horizon minutes from now"""
+    total = 0
+    for worker in factory.workers:
+        if worker.calendar is None:
+            total += min(worker.remaining_hours(), horizon)
+            continue
+        time, end = factory.time, factory.time + horizon
+        while time < end:
+            interval = worker.calendar.get_interval(time)
+            change = min(worker.calendar.next_change(time), end)
+            if interval:
+                total += change - time
+            time = change
+    return total
+
+
+def estimate(factory, horizon=None):
+    lines = LineGraph(factory.production_units)
+    units = {}
+    for pu in factory.production_units:
+        cycle_time, products, load_minutes = get_cycle(pu, lines.get_fed_types(pu))
+        capacity = get_availability(pu) * products / cycle_time if products and cycle_time else 0.0
+        units[pu] = {"cycle_time": cycle_time, "products_per_cycle": products, "capacity": capacity,
+                     "throughput": capacity, "limited_by": "cycle" if capacity else "never",
+                     "load_minutes": float(load_minutes) / products if products else 0.0}
+
+    demand = sum(values["throughput"] * values["load_minutes"] for values in units.values())
+    share = min(1.0, len(factory.workers) / demand) if demand else 1.0
+    if share < 1:
+        for values in units.values():
+            if values["load_minutes"]:
+                values["throughput"] *= share
+                values["limited_by"] = "workers"
+
+    for pu in lines.order:
+        if not lines.is_fed(pu) or not units[pu]["throughput"]:
+            continue
+        needs = get_needs(pu)
+        fed = [type for type in lines.get_fed_types(pu) if type in needs]
+        if not fed:
+            # upstream units only stock what pu does not need
+            continue
+        supply = min(sum(units[producer]["throughput"] * get_outputs(producer).get(type, 0)
+                         for producer in lines.upstream[pu]) / needs[type]
+                     for type in fed)
+        if supply < units[pu]["throughput"]:
+            units[pu]["throughput"], units[pu]["limited_by"] = supply, "supply"
+
+    for pu in reversed(lines.order):
+        outputs = get_outputs(pu)
+        if not pu.output_stocking_zone.size or not lines.downstream.get(pu) or not outputs:
+            continue
+        taken = max(sum(units[consumer]["throughput"] * get_needs(consumer).get(type, 0)
+                        for consumer in lines.downstream[pu]) / quantity
+                    for type, quantity in outputs.items())
+        if taken < units[pu]["throughput"]:
+            units[pu]["throughput"], units[pu]["limited_by"] = taken, "stock"
+
+    if horizon is not None:
+        busy = min(len(factory.workers), len(factory.production_units))
+        worker_time = float(get_worker_minutes(factory, horizon)) / busy if busy else 0
+        for pu, values in units.items():
+            # the unit starts during its first minute
+            time = horizon - (1 if pu.protocol.in_prologue() else 0)
+            if values["load_minutes"] or lines.is_fed(pu):
+                time = min(time, worker_time)
+            values["units_produced"] = int(values["throughput"] * max(time, 0))
+
+    running = [pu for pu in factory.production_units if units[pu]["limited_by"] == "cycle"]
+    if share < 1:
+        bottleneck = "workers"
+    elif running:
+        bottleneck = min(running, key=lambda pu: units[pu]["capacity"]).name
+    else:
+        bottleneck = None
+    return {"production_units": dict((pu.name, values) for pu, values in units.items()),
+            "workers": {"count": len(factory.workers), "load_demand": demand},
+            "bottleneck": bottleneck}
+
+
+def compare(factory, during, event_driven=True):
+    """Units produced estimated for the next during minutes against a simulation of a copy of factory"""
+    estimated = estimate(factory, during)["production_units"]
+    simulated = restore(snapshot(factory))
+    produced = dict((pu.name, pu.unit_produced) for pu in simulated.production_units)
+    try:
+        simulated.run(during, event_driven=event_driven)
+    except NoWorkerToPerformAction:
+        # production stops once the day of work of every worker is over
+        pass
+    values = {}
+    for pu in simulated.production_units:
+        expected = pu.unit_produced - produced[pu.name]
+        guess = estimated[pu.name]["units_produced"]
+        values[pu.name] = {"estimated": guess, "simulated": expected,
+                           "error": float(guess - expected) / expected if expected else float(guess)}
+    return values
@@ -0,0 +1,94 @@
+from core.production_unit import ProductionUnit
+
+STATES = {ProductionUnit.IDLE: "IDLE", ProductionUnit.STARTED: "STARTED",
+          ProductionUnit.PRODUCING: "PRODUCING", ProductionUnit.FAILURE: "FAILURE"}
+
+
+class KPIs(object):
+    """Factory-wide indicators updated online by Factory, in memory constant in time.
+
+    - utilization of production units: share of the time spent in each state
+    - utilization of workers: hours worked over the time observed, over 1 when a
+      worker released during a minute performs another operation in the same minute
+    - queueing: minutes the operations of each production unit waited for a free worker
+    - bottlenecks: production units ranked by share of time producing, the ones
+      starved of workers last
+
+    Event-driven runs are observed at event times only: the minutes skipped since the
+    previous event count in the states observed then, the minute of the event in the
+    states it leads to.
+    """
+
+    def __init__(self):
+        self.start_time = None
+        self.time = None
+        self.state_minutes = {}
+        self.waiting_minutes = {}
+        self.waits = {}
+        self.worker_start_hours = {}
+        self.states = {}
+        self._waiting = set()
+        self._waited = set()
+
+    def start(self, factory):
+        self.start_time = self.time = factory.time
+        for worker in factory.workers:
+            self.worker_start_hours[worker] = worker.hour_worked
+        for pu in factory.production_units:
+            self.states[pu] = pu.get_state()
+
+    def on_step(self, factory, time):
+        elapsed = time - self.time
+        if elapsed <= 0:
+            return
+        self.time = time
+        for pu in factory.production_units:
+            minutes = self.state_minutes.setdefault(pu, [0] * len(STATES))
+            state = pu.get_state()
+            minutes[self.states.get(pu, state)] += elapsed - 1
+            minutes[state] += 1
+            self.states[pu] = state
+        self._waited, self._waiting = self._waiting, set()
+
+    def on_wait(self, operation):
+        pu = operation.production_unit
+        self.waiting_minutes[pu] = self.waiting_minutes.get(pu, 0) + 1
+        if operation not in self._waited:
+            self.waits[pu] = self.waits.get(pu, 0) + 1
+        self._waiting.add(operation)
+
+    def get_elapsed(self):
+        return (self.time - self.start_time) if self.time is not None else 0
+
+    def get_production_unit_utilization(self, pu):
+        elapsed = self.get_elapsed()
+        minutes = self.state_minutes.get(pu, [0] * len(STATES))
+        return dict((name, float(minutes[state]) / elapsed if elapsed else 0.0) for state, name in STATES.items())
+
+    def get_worker_utilization(self, worker):
+        elapsed = self.get_elapsed()
+        if not elapsed:
+            return 0.0
+        return float(worker.hour_worked - self.worker_start_hours.get(worker, 0)) / elapsed
+
+    def get_queueing(self, pu):
+        minutes, waits = self.waiting_minutes.get(pu, 0), self.waits.get(pu, 0)
+        return {"minutes": minutes, "waits": waits, "average": float(minutes) / waits if waits else 0.0}
+
+    def get_bottlenecks(self, factory):
+        elapsed = self.get_elapsed() or 1
+        def score(pu):
+            return (self.get_production_unit_utilization(pu)["PRODUCING"],
+                    -float(self.waiting_minutes.get(pu, 0)) / elapsed)
+        return [pu.name for pu in sorted(factory.production_units, key=score, reverse=True)]
+
+    def get_data(self, factory):
+        values = {}
+        values["elapsed"] = self.get_elapsed()
+        values["production_units"] = dict((pu.name, {"utilization": self.get_production_unit_utilization(pu),
+                                                     "queueing": self.get_queueing(pu),
+                                                     "units_produced": pu.unit_produced})
+                                          for pu in factory.production_units)
+        values["workers"] = [self.get_worker_utilization(worker) for worker in factory.workers]
+        values["bottlenecks"] = self.get_bottlenecks(factory)
+        return values
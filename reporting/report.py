@@ -1,27 +1,67 @@
+import functools
+import weakref
 from core import Entity
+from reporting.capacity import estimate
 
 class EntityNotFound(Exception):pass
 
+# reports of each factory at the time they were computed
+_reports = weakref.WeakKeyDictionary()
+
+
+def cached(method):
+    """Compute a report of a factory once per simulation time"""
+    @functools.wraps(method)
+    def get(self, factory_ID, *args):
+        factory = Entity.get_by_ref(factory_ID)
+        time, reports = _reports.get(factory, (None, None))
+        if time != factory.time:
+            reports = {}
+            _reports[factory] = (factory.time, reports)
+        key = (method.__name__,) + args
+        if key not in reports:
+            reports[key] = method(self, factory, *args)
+        return reports[key]
+    return get
+
+
 class Report(object):
-    def get_factory_data(self, ID_factory):
-        factory = Entity.get_by_ref(ID_factory)
+    @cached
+    def get_factory_data(self, factory):
         values = {}
         values["Current time"] = factory.time
         values["number of production unit"] = len(factory.production_units)
         values["number of workers"] = len(factory.workers)
         return values
 
-    def get_production_unit_data(self, factory_ID, name):
+    def get_profiling_data(self, factory_ID):
         factory = Entity.get_by_ref(factory_ID)
-        values = {}
-        production_unit = None
-        for pu in factory.production_units:
-            if pu.name == name:
-                production_unit = pu
-                break
+        if factory.profiler is None:
+            return {"enabled": False}
+        values = factory.profiler.as_dict()
+        values["enabled"] = True
+        return values
+
+    def get_kpi_data(self, factory_ID):
+        # not cached, kpis can be collected from now on without the time moving
+        factory = Entity.get_by_ref(factory_ID)
+        if factory.kpis is None:
+            return {"enabled": False}
+        values = factory.kpis.get_data(factory)
+        values["enabled"] = True
+        return values
+
+    def get_capacity_data(self, factory_ID, horizon=None):
+        # not cached, workers and production units change without the time moving
+        return estimate(Entity.get_by_ref(factory_ID), horizon)
+
+    @cached
+    def get_production_unit_data(self, factory, name):
+        production_unit = factory.get_production_unit(name)
         if not production_unit:
             raise EntityNotFound("No production unit found with name %s" % name)
+        values = {}
         values["produce"] = [material.type for material in production_unit.spec.output_materials]
         values["units_produced"] = production_unit.unit_produced
-        values["value_produced"] = sum([material.price * production_unit.unit_produced for material in production_unit.spec.output_materials])
-        return values
\ No newline at end of file
+        values["value_produced"] = production_unit.value_produced
+        return values
@@ -0,0 +1,75 @@
+import csv
+import os
+
+
+class Telemetry(object):
+    """Time series of a factory, sampled every interval minutes and appended to a CSV file.
+
+    Columns are the time, then for each production unit the count of its input and
+    output stocking zones, its state (ProductionUnit.IDLE, STARTED, PRODUCING or
+    FAILURE) and its cumulative units produced, then the hours worked by each worker.
+    Samples are buffered column by column and written when buffer_size samples are
+    waiting, so the history is never held in memory.
+
+    Event-driven runs step the factory before each sample time and skip no operation
+    past it, so their samples are the same as the ones of a tick run. Samples waiting
+    in the buffer are written when a run ends, even when an event stops it. Factories
+    restored from a snapshot record no telemetry, they would append to the same file.
+    """
+
+    def __init__(self, path, interval=1, buffer_size=1024):
+        self.path = path
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.header = None
+        self.columns = None
+        self.next_sample = interval
+
+    def get_header(self, factory):
+        header = ["time"]
+        for pu in factory.production_units:
+            header.extend(["%s.inputs" % pu.name, "%s.outputs" % pu.name, "%s.state" % pu.name,
+                           "%s.unit_produced" % pu.name])
+        header.extend(["worker%d.hour_worked" % i for i in range(len(factory.workers))])
+        return header
+
+    def get_values(self, factory, time):
+        values = [time]
+        for pu in factory.production_units:
+            values.extend([pu.inputs_stocking_zone.count(), pu.output_stocking_zone.count(), pu.get_state(),
+                           pu.unit_produced])
+        values.extend([worker.hour_worked for worker in factory.workers])
+        return values
+
+    def sample(self, factory, time):
+        if time < self.next_sample:
+            return
+        self.next_sample = (time // self.interval + 1) * self.interval
+        if self.header is None:
+            self.header = self.get_header(factory)
+            self.columns = [[] for column in self.header]
+        for column, value in zip(self.columns, self.get_values(factory, time)):
+            column.append(value)
+        if len(self.columns[0]) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.header is None:
+            return
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "ab") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(self.header)
+            writer.writerows(zip(*self.columns))
+        for column in self.columns:
+            del column[:]
+
+
+def read_telemetry(path):
+    """Columns of a telemetry file by name, as floats"""
+    with open(path, "rb") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = zip(*reader) or [()] * len(header)
+    return dict((name, [float(value) for value in column]) for name, column in zip(header, columns))
@@ -1,6 +1,8 @@
 from unittest.case import TestCase
 import simplejson
 from api.server import  application
+from api.jobs import Job, JobExecutor
+import threading
 import tornado.httpserver
 import tornado.httpclient
 import tornado.ioloop
@@ -54,6 +56,22 @@ class TestApi(TestCase):
         self.response = response
         tornado.ioloop.IOLoop.instance().stop()
 
+    def fetch(self, path, post_data=None):
+        if post_data is None:
+            request = tornado.httpclient.HTTPRequest('http://localhost:8888%s' % path)
+        else:
+            request = tornado.httpclient.HTTPRequest('http://localhost:8888%s' % path, method="POST",
+                                                     body=urlencode(post_data))
+        self.http_client.fetch(request, self.handle_request)
+        tornado.ioloop.IOLoop.instance().start()
+        return in_python(self.response.body)
+
+    def run_factory(self, time):
+        job = self.fetch('/command/%d' % self.factory.reference, {"command": "run", "time": time})
+        while job["status"] not in ("done", "failed", "cancelled"):
+            job = self.fetch('/jobs/%d' % job["id"])
+        return job
+
     def test_GET_report(self):
         self.http_client.fetch('http://localhost:8888/reports/%d' % self.factory.reference,
             self.handle_request)
@@ -67,11 +85,7 @@ class TestApi(TestCase):
         assert_that(result_dict, has_entries({"Current time": 0}))
 
     def test_get_production_unit_info(self):
-        post_data = {"command":"run", "time":3}
-        self.http_client.fetch(tornado.httpclient.HTTPRequest('http://localhost:8888/command/%d' % self.factory.reference,
-                                                              method="POST", body=urlencode(post_data)),
-            self.handle_request)
-        tornado.ioloop.IOLoop.instance().start()
+        self.run_factory(3)
 
         self.http_client.fetch('http://localhost:8888/reports/%d/productionunit/wiremachine' % self.factory.reference,
             self.handle_request)
@@ -85,44 +99,114 @@ class TestApi(TestCase):
         assert_that(result_dict, has_entries({"value_produced": 5}))
 
 
+    def test_capacity(self):
+        capacity = self.fetch('/reports/%d/capacity?horizon=%d' % (self.factory.reference, 8 * 60))
+        assert_that(capacity, has_entries({"bottleneck": "wiremachine"}))
+        # a minute to load and a minute to produce, during a day of work of 8 hours
+        assert_that(capacity["production_units"]["wiremachine"],
+                    has_entries({"cycle_time": 2, "throughput": 0.5, "units_produced": 239}))
+
     def test_POST_report(self):
-        post_data = {"command":"run", "time":2}
+        job = self.run_factory(2)
+        assert_that(self.response.error, is_(none()))
+        assert_that(job, has_entries({"status": "done", "time": 2, "target": 2}))
+        assert_that(self.factory.time, is_(2))
+
+    def test_profiling(self):
+        post_data = {"command": "profile", "profiling": "on"}
         self.http_client.fetch(tornado.httpclient.HTTPRequest('http://localhost:8888/command/%d' % self.factory.reference,
                                                               method="POST", body=urlencode(post_data)),
             self.handle_request)
         tornado.ioloop.IOLoop.instance().start()
-        assert_that(self.response.error, is_(none()))
-        assert_that(self.factory.time, is_(2))
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        self.factory.run(3)
 
+        self.http_client.fetch('http://localhost:8888/reports/%d/profiling' % self.factory.reference,
+            self.handle_request)
+        tornado.ioloop.IOLoop.instance().start()
 
+        assert_that(self.response.error, is_(none()))
+        result_dict = in_python(self.response.body)
+        assert_that(result_dict, has_entries({"enabled": True}))
+        assert_that(result_dict["production_units"]["wiremachine"]["step"]["calls"], is_(3))
+
+    def test_fork_from_snapshot(self):
+        self.run_factory(3)
+        self.fetch('/command/%d' % self.factory.reference, {"command": "snapshot"})
+        self.run_factory(2)
+        references = self.fetch('/command/%d' % self.factory.reference, {"command": "fork", "count": 2})["factories"]
+        assert_that(len(references), is_(2))
+        self.http_client.fetch('http://localhost:8888/reports/%d' % references[0], self.handle_request)
+        tornado.ioloop.IOLoop.instance().start()
+        assert_that(in_python(self.response.body), has_entries({"Current time": 3}))
+
+    def test_cancel_job(self):
+        self.factory.workers[0].working_hour = 10 ** 9
+        job = self.fetch('/command/%d' % self.factory.reference, {"command": "run", "time": 10 ** 8})
+        report = self.fetch('/reports/%d' % self.factory.reference)
+        assert_that(report["Current time"], less_than(10 ** 8))
+
+        job = self.fetch('/jobs/%d' % job["id"], {"command": "cancel"})
+        while job["status"] in ("pending", "running"):
+            job = self.fetch('/jobs/%d' % job["id"])
+        assert_that(job["status"], is_("cancelled"))
+        assert_that(job["time"], less_than(10 ** 8))
+
+
+class BlockedJob(Job):
+    """Job which only runs once it is let go"""
+
+    def __init__(self, factory):
+        super(BlockedJob, self).__init__(factory, 1)
+        self.go = threading.Event()
+        self.started = threading.Event()
+
+    def run(self):
+        self.started.set()
+        self.go.wait(10)
+        super(BlockedJob, self).run()
+
+
+class TestJobExecutor(TestCase):
+
+    def wait(self, job):
+        for i in range(1000):
+            if job.is_finished():
+                return
+            threading.Event().wait(0.01)
+
+    def test_jobs_of_a_busy_factory_do_not_hold_the_threads(self):
+        executor = JobExecutor(workers=2)
+        busy, other = get_factory(config), get_factory(config)
+        blocked = [executor.submit(BlockedJob(busy)) for i in range(3)]
+        try:
+            job = executor.submit(Job(other, 5))
+            self.wait(job)
+            assert_that(job.status, is_("done"))
+            assert_that([blocked_job.is_finished() for blocked_job in blocked], is_([False] * 3))
+        finally:
+            for blocked_job in blocked:
+                blocked_job.go.set()
+        self.wait(blocked[-1])
+        assert_that(busy.time, is_(3))
+
+    def test_finished_jobs_are_forgotten(self):
+        executor = JobExecutor(workers=1, ttl=0)
+        job = executor.submit(Job(get_factory(config), 1))
+        self.wait(job)
+        assert_that(executor.get(job.id), is_(none()))
+        assert_that(executor.jobs, is_({}))
+
+    def test_factories_are_held_while_a_job_runs_them(self):
+        executor = JobExecutor(workers=1)
+        job = executor.submit(BlockedJob(get_factory(config)))
+        try:
+            job.started.wait(10)
+            with executor.hold_factory(job.factory, blocking=False) as idle:
+                assert_that(idle, is_(False))
+        finally:
+            job.go.set()
+        self.wait(job)
+        with executor.hold_factory(job.factory, blocking=False) as idle:
+            assert_that(idle, is_(True))
+        # the lock of the factory is forgotten with its last user
+        assert_that(executor.locks, is_({}))
@@ -0,0 +1,100 @@
+from unittest import TestCase
+from hamcrest import *
+from configuration import get_factory, get_batch
+from configuration.schema import ConfigurationError
+
+config = """
+name: bakery
+materials:
+    - type: wood
+      price: 3
+    - type: wire
+      price: 5
+    - type: flour
+      price: 1
+    - type: bread
+      price: 4
+
+production_units:
+    - name: wiremachine
+      rate: 0.5
+      inputs:
+          - input_type: wood
+            input_quantity: 1
+      outputs:
+          - input_type: wire
+            input_quantity: 1
+    - name: oven
+      rate: 0.25
+      inputs:
+          - input_type: flour
+            input_quantity: 2
+          - input_type: wood
+            input_quantity: 1
+      outputs:
+          - input_type: bread
+            input_quantity: 1
+workers:
+    - type: generic
+      working_hour: 8
+    - type: generic
+      working_hour: 8
+    - type: generic
+      working_hour: 8
+    - type: generic
+      working_hour: 8
+"""
+
+class TestBatchFactory(TestCase):
+
+    def test_same_production_as_factory(self):
+        factory = get_factory(config)
+        factory.run(16 * 60)
+
+        batch = get_batch(config, 3)
+        batch.run(16 * 60)
+        results = batch.get_results()
+
+        produced = [pu.unit_produced for pu in factory.production_units]
+        assert_that(results["production_units"], is_(["wiremachine", "oven"]))
+        assert_that(results["units_produced"].tolist(), is_([produced] * 3))
+        assert_that(results["value_produced"][0].tolist(), is_([produced[0] * 5, produced[1] * 4]))
+        assert_that(results["stock"][0].tolist(), is_(produced))
+
+    def test_scenario_parameters(self):
+        batch = get_batch(config, 3, rate=[1, 0.5, 0.25], workers=[2, 2, 0], stock_size=[None, 10, None])
+        batch.run(60)
+        units = batch.get_results()["units_produced"]
+
+        # 1 minute to start, then 1 minute to load and 1 minute to produce with a rate of 1
+        assert_that(units[0, 0], is_(29))
+        assert_that(units[1, 0], is_(10))
+        # nobody to load the machines
+        assert_that(units[2].tolist(), is_([0, 0]))
+
+    def test_same_production_as_factory_with_replicas(self):
+        replicated = config.replace("    - name: oven\n", "    - name: oven\n      number: 2\n")
+        factory = get_factory(replicated)
+        factory.run(8 * 60)
+
+        batch = get_batch(replicated, 2)
+        batch.run(8 * 60)
+
+        produced = [pu.unit_produced for pu in factory.production_units]
+        assert_that(batch.get_results()["units_produced"].tolist(), is_([produced] * 2))
+
+    def test_unsupported_configurations(self):
+        for key, value in (("load_time", 3), ("crew", 2)):
+            unsupported = config.replace("      rate: 0.25\n", "      rate: 0.25\n      %s: %d\n" % (key, value))
+            self.assertRaises(ConfigurationError, get_batch, unsupported, 2)
+        shift = config.replace("      working_hour: 8\n", "      working_hour: 8\n      shift: {start: 8, hours: 8}\n", 1)
+        self.assertRaises(ConfigurationError, get_batch, shift, 2)
+
+    def test_skills_are_unsupported(self):
+        skilled = config.replace("      rate: 0.25\n", "      rate: 0.25\n      skills: [baker]\n")
+        self.assertRaises(ConfigurationError, get_batch, skilled, 2)
+        self.assertRaises(ConfigurationError, get_batch, config + "worker_policy: least_loaded\n", 2)
+
+    def test_failures_are_unsupported(self):
+        failing = config.replace("      rate: 0.25\n", "      rate: 0.25\n      mtbf: 2\n      mttr: 0.5\n")
+        self.assertRaises(ConfigurationError, get_batch, failing, 2)
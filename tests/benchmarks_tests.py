@@ -0,0 +1,27 @@
+from unittest import TestCase
+from hamcrest import *
+from benchmarks import compare, get_benchmarks, measure
+
+
+class TestBenchmarks(TestCase):
+
+    def test_measure(self):
+        result = measure("process_chain", 8)
+        assert_that(result["steps"], is_(20000))
+        assert_that(result["steps_per_sec"], greater_than(0))
+        assert_that(result, has_key("objects"))
+        assert_that(result, has_key("peak_memory_kb"))
+
+    def test_get_benchmarks(self):
+        assert_that(get_benchmarks(["stock_add"]),
+                    is_([("stock_add[10]", "stock_add", 10), ("stock_add[100]", "stock_add", 100),
+                         ("stock_add[1000]", "stock_add", 1000)]))
+
+    def test_compare_with_baseline(self):
+        baseline = {"a[1]": {"steps_per_sec": 1000, "objects": 10, "peak_memory_kb": 100},
+                    "b[1]": {"steps_per_sec": 1000, "objects": 10, "peak_memory_kb": 100}}
+        results = {"a[1]": {"steps_per_sec": 900, "objects": 12, "peak_memory_kb": 200},
+                   "b[1]": {"steps_per_sec": 500, "objects": 5000, "peak_memory_kb": 100},
+                   "c[1]": {"steps_per_sec": 1, "objects": 10 ** 6, "peak_memory_kb": 10 ** 6}}
+        assert_that(compare(results, baseline),
+                    is_([("b[1]", "steps_per_sec", 1000, 500), ("b[1]", "objects", 10, 5000)]))
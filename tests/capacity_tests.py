@@ -0,0 +1,105 @@
+from unittest import TestCase
+from hamcrest import *
+from configuration import get_factory
+from core.factory import Factory
+from core.material import Material
+from core.production_unit import ProductionUnit
+from core.specification import Specification, MaterialInputConstraint
+from core.worker import Worker
+from reporting.capacity import estimate, compare, get_product_steps
+from tests.utils import create_machine
+
+config = """
+name: bakery
+materials:
+    - type: bread
+      price: 4
+production_units:
+    - name: oven
+      rate: %s
+      inputs:
+          - {input_type: flour, input_quantity: 2}
+          - {input_type: wood, input_quantity: 1}
+      outputs:
+          - {input_type: bread, input_quantity: 1}
+workers:
+    - number: %d
+      working_hour: 8
+"""
+
+
+class TestCapacity(TestCase):
+
+    def test_product_steps(self):
+        assert_that(get_product_steps(0.25), is_(4))
+        assert_that(get_product_steps(1), is_(1))
+        # progress is exact, 0.1 added 10 times is 1 but 0.3 goes past 1
+        assert_that(get_product_steps(0.1), is_(10))
+        assert_that(get_product_steps(0.3), is_(none()))
+
+    def test_cycle_of_a_production_unit(self):
+        capacity = estimate(get_factory(config % (0.25, 1)))
+        oven = capacity["production_units"]["oven"]
+        assert_that(oven["cycle_time"], is_(2 + 4))
+        assert_that(oven["throughput"], close_to(1 / 6.0, 1e-9))
+        assert_that(capacity["bottleneck"], is_("oven"))
+
+    def test_unit_which_never_produces(self):
+        capacity = estimate(get_factory(config % (0.3, 1)))
+        assert_that(capacity["production_units"]["oven"], has_entries({"throughput": 0, "limited_by": "never"}))
+        assert_that(capacity["bottleneck"], is_(none()))
+
+    def test_workers_are_the_bottleneck(self):
+        factory = get_factory(config % (1, 1))
+        for i in range(3):
+            machine, spec, stock = create_machine(stocking_zone_size=None)
+            factory.add_production_unit(machine)
+        capacity = estimate(factory)
+        assert_that(capacity["bottleneck"], is_("workers"))
+        assert_that(capacity["workers"]["load_demand"], greater_than(1))
+
+    def test_24_hours_shifts(self):
+        # same as the scenario: 1 minute to load, 1 to produce, 3 workers of 8 hours
+        machine, spec, stock = create_machine(stocking_zone_size=None)
+        factory = Factory()
+        factory.add_production_unit(machine)
+        for i in range(3):
+            factory.add_worker(Worker(working_hour=8 * 60))
+        assert_that(compare(factory, 24 * 60)[""], has_entries({"estimated": 720 - 1, "simulated": 720 - 1}))
+        assert_that(factory.time, is_(0))
+
+    def test_line_is_limited_by_its_slowest_unit(self):
+        saw, spec, planks = create_machine(material_type_input="wood", material_type_output="plank",
+                                           stocking_zone_size=3)
+        saw.name = "saw"
+        assembly_spec = Specification()
+        assembly_spec.add(MaterialInputConstraint(Material(type="plank", quantity=1)))
+        assembly_spec.add_output_material(Material(type="furniture", quantity=1))
+        assembly = ProductionUnit(assembly_spec, {"rate_by_minute": 0.125}, input_stocking_zone=planks,
+                                  name="assembly")
+        factory = Factory()
+        factory.add_production_unit(assembly)
+        factory.add_production_unit(saw)
+        factory.add_worker(Worker(working_hour=10 ** 6))
+        factory.add_worker(Worker(working_hour=10 ** 6))
+
+        capacity = estimate(factory)
+        assert_that(capacity["bottleneck"], is_("assembly"))
+        assert_that(capacity["production_units"]["saw"], has_entries({"limited_by": "stock", "throughput": 0.125}))
+        for values in compare(factory, 2000).values():
+            assert_that(abs(values["error"]), less_than(0.05))
+
+    def test_upstream_unit_stocking_unneeded_materials(self):
+        saw, spec, planks = create_machine(material_type_input="wood", material_type_output="plank")
+        saw.name = "saw"
+        glue_spec = Specification()
+        glue_spec.add(MaterialInputConstraint(Material(type="glue", quantity=1)))
+        glue_spec.add_output_material(Material(type="panel", quantity=1))
+        press = ProductionUnit(glue_spec, {"rate_by_minute": 0.5}, input_stocking_zone=planks, name="press")
+        factory = Factory()
+        factory.add_production_unit(saw)
+        factory.add_production_unit(press)
+        factory.add_worker(Worker(working_hour=10 ** 6))
+
+        capacity = estimate(factory)
+        assert_that(capacity["production_units"]["press"]["limited_by"], is_not("supply"))
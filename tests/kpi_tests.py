@@ -0,0 +1,76 @@
+from unittest.case import TestCase
+from core.event import NoWorkerToPerformAction
+from core.failure import Breakdowns
+from hamcrest import *
+from core.factory import Factory
+from core.worker import Worker
+from reporting.kpi import KPIs
+from tests.utils import create_machine
+
+
+class TestKPIs(TestCase):
+
+    def setUp(self):
+        self.factory = Factory()
+        for name, rate in (("fast", 1), ("slow", 0.25)):
+            machine, spec, zone = create_machine(material_type_input="yarn", stocking_zone_size=None, rate=rate)
+            machine.name = name
+            self.factory.add_production_unit(machine)
+        self.factory.add_worker(Worker())
+        self.kpis = self.factory.collect_kpis(KPIs())
+
+    def test_operations_wait_for_a_busy_worker(self):
+        self.factory.run(100)
+
+        data = self.kpis.get_data(self.factory)
+        assert_that(data["elapsed"], is_(100))
+        queueing = [data["production_units"][name]["queueing"] for name in ("fast", "slow")]
+        assert_that(queueing[0]["minutes"] + queueing[1]["minutes"], greater_than(0))
+        for values in queueing:
+            assert_that(values["minutes"], greater_than_or_equal_to(values["waits"]))
+
+    def test_utilization(self):
+        self.factory.run(100)
+
+        utilization = self.kpis.get_production_unit_utilization(self.factory.production_units[1])
+        assert_that(sum(utilization.values()), close_to(1, 1e-9))
+        assert_that(utilization["PRODUCING"], greater_than(0.5))
+        assert_that(self.kpis.get_worker_utilization(self.factory.workers[0]),
+                    is_(self.factory.workers[0].hour_worked / 100.0))
+
+    def test_bottlenecks(self):
+        self.factory.run(100)
+        assert_that(self.kpis.get_bottlenecks(self.factory), is_(["slow", "fast"]))
+
+    def test_kpis_do_not_change_the_run(self):
+        other = Factory()
+        for name, rate in (("fast", 1), ("slow", 0.25)):
+            machine, spec, zone = create_machine(material_type_input="yarn", stocking_zone_size=None, rate=rate)
+            other.add_production_unit(machine)
+        other.add_worker(Worker())
+        for factory in (self.factory, other):
+            factory.run(100)
+        assert_that([pu.unit_produced for pu in other.production_units],
+                    is_([pu.unit_produced for pu in self.factory.production_units]))
+
+    def test_operations_can_stop_the_run_instead_of_waiting(self):
+        self.factory.wait_for_workers = False
+        self.assertRaises(NoWorkerToPerformAction, self.factory.run, 100)
+
+    def test_event_driven_kpis_with_breakdowns(self):
+        data = []
+        for event_driven in (False, True):
+            factory = Factory()
+            for name, rate in (("fast", 1), ("slow", 0.25)):
+                machine, spec, zone = create_machine(material_type_input="yarn", stocking_zone_size=None, rate=rate)
+                machine.name = name
+                machine.config.update({"mtbf": 120, "mttr": 30})
+                factory.add_production_unit(machine)
+            factory.add_worker(Worker(working_hour=5000))
+            factory.simulate_failures(Breakdowns(seed=3))
+            kpis = factory.collect_kpis(KPIs())
+            factory.run(3000, event_driven=event_driven)
+            data.append(kpis.get_data(factory))
+        assert_that(data[1], is_(data[0]))
+        assert_that(data[0]["elapsed"], is_(3000))
+        assert_that(data[0]["production_units"]["slow"]["utilization"]["FAILURE"], greater_than(0.1))
@@ -135,6 +135,27 @@ class TestProtocol(TestCase):
         self.assertEquals(self.machine.protocol.next(), LoadOperation(Material("yarn"), production_unit=self.machine))
         self.assertEquals(self.machine.protocol.next(), ProduceOperation(production_unit=self.machine))
 
+    def test_protocol_cycle_reuses_operations(self):
+        machine, spec, zone = create_machine(material_type_input="yarn")
+        start, load, produce = [machine.protocol.next() for i in range(3)]
+        load.progress = 1
+        self.assertIs(machine.protocol.next(), load)
+        self.assertEquals(load.progress, 0)
+        self.assertIs(machine.protocol.next(), produce)
+        self.assertIsNot(machine.protocol.next(), start)
+
+    def test_protocol_manipulation(self):
+        machine, spec, zone = create_machine(material_type_input="yarn")
+        start, load = machine.protocol.next(), machine.protocol.next()
+        machine.protocol.insert(0, StopOperation)
+        machine.protocol.override(1, time_to_perform=5)
+        self.assertEquals(machine.protocol.next(), ProduceOperation(production_unit=machine))
+        self.assertIsInstance(machine.protocol.next(), StopOperation)
+        self.assertEquals(machine.protocol.next().time_to_perform, 5)
+        machine.protocol.move(0, 2)
+        self.assertIsInstance(machine.protocol.next(), ProduceOperation)
+        self.assertIsInstance(machine.protocol.next(), StopOperation)
+
 class TestStock(unittest.TestCase):
 
     def test_count(self):
@@ -142,4 +163,26 @@ class TestStock(unittest.TestCase):
         stock_zone.add_to_stock(Material("something", 2))
         stock_zone.add_to_stock(Material("something", 1))
         stock_zone.add_to_stock(Material("other", 4))
-        self.assertEquals(stock_zone.count(), 7)
\ No newline at end of file
+        self.assertEquals(stock_zone.count(), 7)
+
+    def test_count_after_withdrawals(self):
+        stock_zone = StockingZone(size=10)
+        stock_zone.add_to_stock([Material("something", 3), Material("other", 4)])
+        stock_zone.remove(Material("something", 1))
+        self.assertEquals(stock_zone.count(), 6)
+        self.assertEquals(stock_zone.quantity("something"), 2)
+        self.assertEquals(stock_zone.free_space(), 4)
+
+        stock_zone.remove(Material("something", 2))
+        self.assertEquals(stock_zone.popitem(), Material("other", 4))
+        self.assertEquals(stock_zone.count(), 0)
+        self.assertFalse(stock_zone.is_full())
+
+    def test_listeners_are_called_once(self):
+        stock_zone = StockingZone(size=10)
+        changes = []
+        stock_zone.listen(changes.append)
+        stock_zone.add_to_stock(Material("something", 3))
+        stock_zone.remove(Material("something", 1))
+        self.assertEquals(changes, [stock_zone])
+
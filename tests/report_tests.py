@@ -0,0 +1,56 @@
+from unittest.case import TestCase
+from hamcrest import *
+from configuration import get_factory
+from core.worker import Worker
+from reporting.kpi import KPIs
+from reporting.report import Report, EntityNotFound
+
+config = """
+name: textil
+materials:
+    - type: wire
+      price: 5
+production_units:
+    - name: wiremachine
+      inputs:
+          - input_type: wood
+            input_quantity: 1
+      outputs:
+          - input_type: wire
+            input_quantity: 1
+workers:
+    - working_hour: 8
+"""
+
+
+class TestReport(TestCase):
+
+    def setUp(self):
+        self.factory = get_factory(config)
+        self.report = Report()
+
+    def test_reports_are_cached_until_time_advances(self):
+        data = self.report.get_production_unit_data(self.factory.reference, "wiremachine")
+        assert_that(Report().get_production_unit_data(self.factory.reference, "wiremachine"), same_instance(data))
+
+        self.factory.run(3)
+        data = self.report.get_production_unit_data(self.factory.reference, "wiremachine")
+        assert_that(data, has_entries({"units_produced": 1, "value_produced": 5}))
+        assert_that(self.report.get_factory_data(self.factory.reference), has_entries({"Current time": 3}))
+
+    def test_kpis_and_capacity_are_reported_as_soon_as_they_change(self):
+        assert_that(self.report.get_kpi_data(self.factory.reference), is_({"enabled": False}))
+        self.factory.collect_kpis(KPIs())
+        assert_that(self.report.get_kpi_data(self.factory.reference), has_entries({"enabled": True, "elapsed": 0}))
+
+        workers = self.report.get_capacity_data(self.factory.reference)["workers"]
+        self.factory.add_worker(Worker())
+        assert_that(self.report.get_capacity_data(self.factory.reference)["workers"], is_not(workers))
+
+    def test_production_unit_lookup_by_name(self):
+        pu = self.factory.production_units[0]
+        assert_that(self.factory.get_production_unit("wiremachine"), is_(pu))
+        pu.name = "loom"
+        assert_that(self.factory.get_production_unit("loom"), is_(pu))
+        assert_that(self.factory.get_production_unit("wiremachine"), is_(none()))
+        self.assertRaises(EntityNotFound, self.report.get_production_unit_data, self.factory.reference, "wiremachine")
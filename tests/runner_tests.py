@@ -0,0 +1,73 @@
+from unittest import TestCase
+from hamcrest import *
+from configuration.runner import RunningMean, replicate, run_many
+
+config = """
+name: %s
+materials:
+    - type: wood
+      price: 3
+    - type: wire
+      price: 5
+
+production_units:
+    - name: wiremachine
+      rate: %s
+      inputs:
+          - input_type: wood
+            input_quantity: 1
+      outputs:
+          - input_type: wire
+            input_quantity: 1
+workers:
+    - type: generic
+      working_hour: 8
+"""
+failing_config = config.replace("      rate: %s\n", "      rate: %s\n      mtbf: 1\n      mttr: 0.25\n")
+
+
+class TestRunMany(TestCase):
+
+    def test_run_many_in_parallel(self):
+        results = run_many([config % ("fast", 1), config % ("slow", 0.5)], during=61, workers=2)
+
+        assert_that([result["name"] for result in results], is_(["fast", "slow"]))
+        assert_that(results[0]["factory"], has_entries({"Current time": 61, "number of workers": 1}))
+        assert_that(results[0]["production_units"]["wiremachine"], has_entries({"units_produced": 30, "value_produced": 150}))
+        assert_that(results[1]["production_units"]["wiremachine"], has_entries({"units_produced": 20}))
+        assert_that(results[1]["error"], is_(none()))
+
+    def test_run_stopped_by_an_event(self):
+        results = run_many([config % ("textil", 1)], during=8 * 60 + 2, workers=1)
+
+        assert_that(results[0]["error"], starts_with("NoWorkerToPerformAction"))
+        assert_that(results[0]["production_units"]["wiremachine"], has_entries({"units_produced": 240}))
+
+
+class TestReplicate(TestCase):
+
+    def test_running_mean(self):
+        mean = RunningMean()
+        for value in (2, 4, 6):
+            mean.add(value)
+        assert_that(mean.mean, is_(4))
+        # t quantile of 2 degrees of freedom times the standard error
+        assert_that(mean.half_width, close_to(4.303 * 2 / 3 ** 0.5, 1e-9))
+        assert_that(mean.is_precise(0.5), is_(False))
+
+    def test_replications_stop_when_precise(self):
+        stats = list(replicate(failing_config % ("textil", 1), during=8 * 60, precision=0.05,
+                               max_replications=50, seed=1, workers=1))
+
+        assert_that([s["replications"] for s in stats], is_(range(1, len(stats) + 1)))
+        assert_that(len(stats), all_of(greater_than_or_equal_to(5), less_than(50)))
+        assert_that(stats[-1]["precise"], is_(True))
+        assert_that(stats[-1]["units_produced"]["mean"], all_of(greater_than(0), less_than(240)))
+        assert_that(stats[-1]["value_produced"]["mean"], close_to(stats[-1]["units_produced"]["mean"] * 5, 1e-6))
+        assert_that(stats[-1]["production_units"]["wiremachine"]["units_produced"],
+                    is_(stats[-1]["units_produced"]))
+
+    def test_replications_are_seeded(self):
+        runs = [list(replicate(failing_config % ("textil", 1), during=8 * 60, min_replications=3,
+                               max_replications=3, seed=7, workers=workers)) for workers in (1, 2)]
+        assert_that(runs[1], is_(runs[0]))
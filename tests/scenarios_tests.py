@@ -1,10 +1,12 @@
 from unittest.case import TestCase
-from core.event import Event
+from core.event import Event, StockIsFull
 from core.factory import Factory
 
 from core.material import Material
-from core.operation import StartOperation, LoadOperation, ProduceOperation, Process, UnloadOperation, ParallelProcess
-from core.production_unit import  StockingZone
+from core.operation import Operation, StartOperation, LoadOperation, ProduceOperation, Process, UnloadOperation, ParallelProcess,\
+    OperationGraph, stocked
+from core.production_unit import  StockingZone, ProductionUnit
+from core.specification import Specification, MaterialInputConstraint
 from core.worker import Worker
 from tests.utils import create_machine
 
@@ -94,6 +96,76 @@ class TestScenario(TestCase):
         main_process.run(56)
         self.assertEquals(secondary_area.count(), 30)
 
+    def test_process_of_one_operation(self):
+        product_op = ProduceOperation(production_unit=self.machine)
+        LoadOperation(Material(type="wood", quantity=3), production_unit=self.machine, worker=self.worker).run()
+        process = Process(self.machine, [product_op])
+        process.run(3)
+
+        self.assertEquals(self.stock_zone.count(), 3)
+
+    def test_operation_graph_as_a_process(self):
+        # load, then produce, then load again, like test_hour_of_production_scenario
+        load_op = LoadOperation(Material(type="wood", quantity=1), production_unit=self.machine, worker=self.worker)
+        product_op = ProduceOperation(production_unit=self.machine, worker=self.worker)
+        graph = OperationGraph(self.machine)
+        graph.add(load_op)
+        graph.add(product_op, after=[load_op])
+        graph.run(60)
+
+        self.assertEquals(self.stock_zone.count(), 30)
+
+    def test_unload_after_some_products(self):
+        load_op = LoadOperation(Material(type="wood", quantity=1), production_unit=self.machine, worker=self.worker)
+        product_op = ProduceOperation(production_unit=self.machine, worker=self.worker)
+        secondary_area = StockingZone()
+        unload_op = UnloadOperation(quantity=5, zone=secondary_area, production_unit=self.machine, worker=self.worker)
+        loop = OperationGraph(self.machine)
+        loop.add(load_op)
+        loop.add(product_op, after=[load_op])
+        unloading = OperationGraph(self.machine)
+        unloading.add(unload_op, when=[stocked(self.stock_zone, 5)])
+        graph = ParallelProcess([loop, unloading])
+
+        graph.run(9)
+        self.assertEquals((self.stock_zone.count(), secondary_area.count()), (4, 0))
+        graph.run(1)
+        self.assertEquals((self.stock_zone.count(), secondary_area.count()), (0, 5))
+
+    def test_operation_graph_of_equal_operations(self):
+        gate = []
+        graph = OperationGraph()
+        a = graph.add(Operation(time_to_perform=1), when=[lambda: gate])
+        b = graph.add(Operation(time_to_perform=1))
+        c = graph.add(Operation(time_to_perform=1), after=[b])
+        graph.run(2)
+        self.assertEquals([id(operation) for operation in graph.runnable], [id(a)])
+        gate.append(True)
+        graph.run(1)
+        # the cycle is over, every operation runs again
+        self.assertEquals(graph.remaining, 3)
+        self.assertEquals([id(operation) for operation in graph.runnable], [id(a), id(b)])
+        self.assertEquals(c.progress, 1)
+
+    def test_operation_graph_event_driven(self):
+        def run_graph(event_driven):
+            machine, spec, stock_zone = create_machine(material_type_input="wood", material_type_output="plank",
+                                                       stocking_zone_size=None, rate=0.5)
+            worker, helper = Worker(working_hour=24 * 60), Worker(working_hour=24 * 60)
+            StartOperation(production_unit=machine, time_to_perform=1, worker=worker).run(during=1)
+            wood = LoadOperation(Material(type="wood", quantity=8), time_to_perform=8, production_unit=machine,
+                                 worker=worker)
+            more_wood = LoadOperation(Material(type="wood", quantity=4), time_to_perform=4, production_unit=machine,
+                                      worker=helper)
+            graph = OperationGraph(machine)
+            graph.add(wood)
+            graph.add(more_wood)
+            graph.add(ProduceOperation(production_unit=machine, worker=worker), after=[wood, more_wood])
+            graph.run(10 * 60 + 7, event_driven=event_driven)
+            return stock_zone.count(), worker.hour_worked, helper.hour_worked
+
+        self.assertEquals(run_graph(event_driven=True), run_graph(event_driven=False))
+
     def test_chained_production_in_sequence(self):
         # Machine A -> Machine B
         machine_b, spec, stock_zone = create_machine(material_type_input="plank", material_type_output="furniture")
@@ -120,4 +192,67 @@ class TestScenario(TestCase):
         factory.add_production_unit(machine)
         factory.run(24 * 60)
 
-        self.assertEquals(stock.count(), 720 - 1)
\ No newline at end of file
+        self.assertEquals(stock.count(), 720 - 1)
+
+    def test_24_hours_shifts_event_driven(self):
+        machine, spec, stock = create_machine(stocking_zone_size=None)
+        factory = Factory()
+        factory.add_worker(Worker(working_hour = 8 * 60))
+        factory.add_worker(Worker(working_hour = 8 * 60))
+        factory.add_worker(Worker(working_hour = 8 * 60))
+        factory.add_production_unit(machine)
+        factory.run(24 * 60, event_driven=True)
+
+        self.assertEquals(factory.time, 24 * 60)
+        self.assertEquals(stock.count(), 720 - 1)
+
+    def test_event_driven_process_skips_idle_minutes(self):
+        # 8 minutes to load 16, 2 minutes to produce each
+        # leading to 16 produce every 40 minutes
+        def run_process(event_driven):
+            machine, spec, stock_zone = create_machine(material_type_input="wood", material_type_output="plank",
+                                                       stocking_zone_size=None, rate=0.5)
+            worker = Worker(working_hour=24 * 60)
+            StartOperation(production_unit=machine, time_to_perform=1, worker=worker).run(during=1)
+            load_op = LoadOperation(Material(type="wood", quantity=16), time_to_perform=8, production_unit=machine, worker=worker)
+            product_op = ProduceOperation(production_unit=machine, worker=worker)
+            process = Process(machine, [load_op, product_op])
+            process.run(10 * 60 + 7, event_driven=event_driven)
+            return stock_zone.count(), worker.hour_worked, process.time
+
+        self.assertEquals(run_process(event_driven=True), run_process(event_driven=False))
+        self.assertEquals(run_process(event_driven=True)[0], 15 * 16)
+
+    def test_full_stock_blocks_upstream_unit(self):
+        # saw -> assembly, the saw makes a plank every 2 minutes and the stock between them holds 3
+        def run_line(event_driven):
+            saw, spec, planks = create_machine(material_type_input="wood", material_type_output="plank",
+                                               stocking_zone_size=3)
+            assembly_spec = Specification()
+            assembly_spec.add(MaterialInputConstraint(Material(type="plank", quantity=1)))
+            assembly_spec.add_output_material(Material(type="furniture", quantity=1))
+            assembly = ProductionUnit(assembly_spec, {"rate_by_minute": 0.125}, input_stocking_zone=planks)
+            factory = Factory()
+            factory.add_production_unit(assembly)
+            factory.add_production_unit(saw)
+            factory.add_worker(Worker(working_hour=10 ** 6))
+            factory.add_worker(Worker(working_hour=10 ** 6))
+            factory.signals.subscribe(StockIsFull, full.append)
+            factory.run(200, event_driven=event_driven)
+            return factory, saw, assembly
+
+        full = []
+        factory, saw, assembly = run_line(event_driven=False)
+        # the saw is stepped first and the assembly no longer loads planks itself
+        self.assertEquals([operation.production_unit for operation in factory.current_operations], [saw, assembly])
+        self.assertEquals(len(assembly.protocol.cycle), 1)
+        self.assertGreater(assembly.unit_produced, 10)
+        self.assertLessEqual(saw.unit_produced - assembly.unit_produced, 3 + 1)
+        # the saw is blocked once each time the stock fills, not every minute until there is room
+        self.assertGreater(len(full), 0)
+        self.assertLessEqual(len(full), assembly.unit_produced + 1)
+
+        event_factory, event_saw, event_assembly = run_line(event_driven=True)
+        self.assertEquals((event_saw.unit_produced, event_assembly.unit_produced),
+                          (saw.unit_produced, assembly.unit_produced))
+
@@ -0,0 +1,75 @@
+from unittest.case import TestCase
+import os
+import tempfile
+from hamcrest import *
+from core.factory import Factory
+from core.production_unit import ProductionUnit
+from core.snapshot import fork, snapshot
+from core.worker import Worker
+from reporting.telemetry import Telemetry, read_telemetry
+from tests.utils import create_machine
+
+
+class TestTelemetry(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mktemp(suffix=".csv")
+        self.factory = Factory()
+        machine, spec, zone = create_machine(material_type_input="yarn", stocking_zone_size=None, rate=0.5)
+        machine.name = "loom"
+        self.factory.add_production_unit(machine)
+        self.factory.add_worker(Worker())
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_sample_every_interval(self):
+        telemetry = self.factory.record_telemetry(Telemetry(self.path, interval=10, buffer_size=2))
+        self.factory.run(40)
+        produced = self.factory.production_units[0].unit_produced
+        self.factory.run(5)
+
+        columns = read_telemetry(self.path)
+        assert_that(columns["time"], is_([10, 20, 30, 40]))
+        assert_that(columns["worker0.hour_worked"], is_([10, 20, 30, 40]))
+        assert_that(columns["loom.state"], only_contains(ProductionUnit.STARTED, ProductionUnit.PRODUCING))
+        assert_that(columns["loom.unit_produced"][-1], is_(produced))
+        assert_that(columns["loom.outputs"][-1], greater_than(0))
+        assert_that(telemetry.columns[0], is_([]))
+
+    def test_buffer_is_written_when_full(self):
+        telemetry = self.factory.record_telemetry(Telemetry(self.path, buffer_size=5))
+        self.factory.do_step()
+        assert_that(os.path.exists(self.path), is_(False))
+        for i in range(4):
+            self.factory.time += 1
+            self.factory.do_step()
+        assert_that(read_telemetry(self.path)["time"], is_([1, 2, 3, 4, 5]))
+
+    def test_event_driven_run(self):
+        self.factory.record_telemetry(Telemetry(self.path, interval=10))
+        self.factory.run(45)
+        ticks = read_telemetry(self.path)
+        os.remove(self.path)
+        self.setUp()
+        self.factory.record_telemetry(Telemetry(self.path, interval=10))
+        self.factory.run(45, event_driven=True)
+        # samples inside a skipped span do not see the end of the span
+        assert_that(read_telemetry(self.path), is_(ticks))
+        assert_that(ticks["time"], is_([10, 20, 30, 40]))
+
+    def test_samples_are_written_when_a_run_stops(self):
+        self.factory.workers[0].working_hour = 25
+        self.factory.record_telemetry(Telemetry(self.path, interval=10))
+        self.assertRaises(Exception, self.factory.run, 100)
+        assert_that(read_telemetry(self.path)["time"], is_([10, 20]))
+
+    def test_forked_runs_do_not_write_to_the_file(self):
+        self.factory.record_telemetry(Telemetry(self.path, interval=10))
+        self.factory.run(15)
+        for factory in fork(snapshot(self.factory), 2):
+            assert_that(factory.telemetry, is_(none()))
+            factory.run(30)
+        self.factory.run(15)
+        assert_that(read_telemetry(self.path)["time"], is_([10, 20, 30]))
@@ -1,6 +1,9 @@
 from unittest import TestCase
 from hamcrest import *
-from configuration import get_factory
+import yaml
+from configuration import get_factory, get_blueprint
+from configuration.schema import ConfigurationError
+from core.specification import FrozenSpecification
 
 
 conf = """ID: 1
@@ -11,6 +14,97 @@ production_units:
     - name: typeB
 """
 
+replicated_conf = """
+name: plant
+materials:
+    - type: cloth
+      price: 3
+specs:
+    cutting:
+        inputs:
+            - input_type: yarn
+              input_quantity: 2
+        outputs:
+            - input_type: cloth
+              input_quantity: 1
+production_units:
+    - name: loom
+      number: 3
+      spec: cutting
+lines:
+    - name: line
+      number: 2
+      production_units:
+          - name: cutter
+            spec: cutting
+          - name: press
+            number: 2
+            rate: 0.5
+workers:
+    - number: 10
+    - working_hour: 4
+"""
+
+skilled_conf = """
+name: weaving
+worker_policy: least_loaded
+materials:
+    - type: cloth
+      price: 3
+production_units:
+    - name: loom
+      skills: [weave]
+      inputs:
+          - {input_type: yarn, input_quantity: 1}
+      outputs:
+          - {input_type: cloth, input_quantity: 1}
+workers:
+    - skills: [weave]
+    - number: 2
+"""
+
+shift_conf = """
+name: plant
+materials:
+    - type: cloth
+      price: 3
+production_units:
+    - name: loom
+      rate: 0.25
+      crew: 2
+      load_time: 4
+      inputs:
+          - {input_type: yarn, input_quantity: 4}
+      outputs:
+          - {input_type: cloth, input_quantity: 1}
+workers:
+    - number: 2
+      shift: {start: 6, hours: 8, breaks: [{at: 4, minutes: 30}]}
+    - shift: {start: 14, hours: 8, days_off: [6]}
+"""
+failing_conf = """
+name: workshop
+seed: 3
+materials:
+    - type: cloth
+      price: 3
+production_units:
+    - name: loom
+      rate: 0.5
+      mtbf: 2
+      mttr: 0.5
+      inputs:
+          - input_type: yarn
+            input_quantity: 1
+      outputs:
+          - input_type: cloth
+            input_quantity: 1
+workers:
+    - number: 1
+      working_hour: 100
+"""
+
+
 class TestConfiguration(TestCase):
 
     def test_simple_configuration(self):
@@ -19,4 +113,131 @@ class TestConfiguration(TestCase):
         assert_that(len(factory.production_units), is_(2))
 
         pu = factory.production_units[0]
-        assert_that(pu.rate, is_(5))
\ No newline at end of file
+        assert_that(pu.rate, is_(5))
+
+    def test_blueprint_is_parsed_once(self):
+        blueprint = get_blueprint(conf)
+        assert_that(get_blueprint(conf), same_instance(blueprint))
+        assert_that(blueprint.production_units[0].rate, is_(5))
+
+        first, second = get_factory(conf), get_factory(conf)
+        assert_that(first.production_units[0], is_not(second.production_units[0]))
+        assert_that(first.production_units[0].spec, same_instance(second.production_units[0].spec))
+
+    def test_invalid_configuration(self):
+        def error_path(yaml_conf):
+            try:
+                get_factory(yaml_conf)
+            except ConfigurationError, e:
+                return e.path
+
+        assert_that(error_path("production_units: []"), is_("name"))
+        assert_that(error_path(conf + "      rate: fast\n"), is_("production_units[1].rate"))
+        assert_that(error_path(conf + "      inputs:\n          - input_type: yarn\n"),
+                    is_("production_units[1].inputs[0].input_quantity"))
+        assert_that(error_path(conf + "      outputs:\n          - {input_type: cloth, input_quantity: 1}\n"),
+                    is_("production_units[1].outputs[0].input_type"))
+        assert_that(error_path(conf + "workers:\n    - working_hours: 8\n"), is_("workers[0].working_hours"))
+
+    def test_unsafe_yaml_is_rejected(self):
+        self.assertRaises(yaml.YAMLError, get_factory, "!!python/object/apply:os.getcwd []")
+
+    def test_replicated_configuration(self):
+        factory = get_factory(replicated_conf)
+
+        names = [pu.name for pu in factory.production_units]
+        assert_that(names, is_(["loom1", "loom2", "loom3", "line1.cutter", "line1.press1", "line1.press2",
+                                "line2.cutter", "line2.press1", "line2.press2"]))
+        assert_that(len(factory.workers), is_(11))
+        assert_that(factory.workers[-1].working_hour, is_(4 * 60))
+        assert_that(factory.production_units[4].line, is_("line1"))
+        assert_that(factory.production_units[0].line, is_(none()))
+        specs = set(id(pu.spec) for pu in factory.production_units)
+        assert_that(len(specs), is_(2))
+        self.assertRaises(FrozenSpecification, factory.production_units[0].spec.add, None)
+
+    def test_unknown_spec(self):
+        try:
+            get_factory(replicated_conf.replace("            spec: cutting", "            spec: sawing"))
+        except ConfigurationError, e:
+            assert_that(e.path, is_("lines[0].production_units[0].spec"))
+        else:
+            self.fail("ConfigurationError not raised")
+
+    def test_skilled_workers(self):
+        factory = get_factory(skilled_conf)
+        factory.run(20)
+
+        weaver = factory.workers[0]
+        assert_that(weaver.skills, is_(["weave"]))
+        assert_that(factory.production_units[0].unit_produced, greater_than(0))
+        for operation in factory.current_operations:
+            if operation.worker and operation.required_skills():
+                assert_that(operation.worker, is_(weaver))
+
+    def test_shift_workers(self):
+        factory = get_factory(shift_conf)
+        morning, afternoon = factory.workers[0], factory.workers[2]
+        assert_that(factory.available_workers, is_([]))
+
+        factory.run(10 * 60)
+        assert_that(factory.production_units[0].unit_produced, greater_than(0))
+        assert_that(morning.hour_worked, greater_than(0))
+        assert_that(afternoon.hour_worked, is_(0))
+
+        factory.run(4 * 60)
+        worked = morning.hour_worked
+        factory.run(10 * 60)
+        # the morning shift is over until 6 the next day
+        assert_that(morning.hour_worked, is_(worked))
+        assert_that(morning.remaining_hours(), is_(0))
+        assert_that(afternoon.hour_worked, greater_than(0))
+        factory.run(7 * 60)
+        assert_that(morning.hour_worked, greater_than(worked))
+
+    def test_shift_workers_event_driven(self):
+        results = []
+        for event_driven in (False, True):
+            factory = get_factory(shift_conf)
+            factory.run(2 * 24 * 60 + 17, event_driven=event_driven)
+            results.append(([w.hour_worked for w in factory.workers], factory.production_units[0].unit_produced))
+        assert_that(results[1], is_(results[0]))
+
+    def test_crew_loads_faster(self):
+        crewed = get_factory(shift_conf)
+        alone = get_factory(shift_conf.replace("crew: 2", "crew: 1"))
+        for factory in (crewed, alone):
+            factory.run(8 * 60)
+        assert_that(crewed.production_units[0].unit_produced,
+                    greater_than(alone.production_units[0].unit_produced))
+
+    def test_invalid_shift(self):
+        try:
+            get_factory(shift_conf.replace("days_off: [6]", "days_off: [7]"))
+        except ConfigurationError, e:
+            assert_that(e.path, is_("workers[1].shift.days_off[0]"))
+        else:
+            self.fail("ConfigurationError not raised")
+
+    def test_failing_production_units(self):
+        reliable = get_factory(failing_conf.replace("      mtbf: 2\n      mttr: 0.5\n", ""))
+        results = []
+        for event_driven in (False, True):
+            factory = get_factory(failing_conf)
+            assert_that(factory.production_units[0].config, has_entries({"mtbf": 120, "mttr": 30}))
+            factory.run(24 * 60, event_driven=event_driven)
+            results.append((factory.production_units[0].unit_produced, factory.workers[0].hour_worked))
+        reliable.run(24 * 60)
+        assert_that(results[1], is_(results[0]))
+        assert_that(results[0][0], less_than(reliable.production_units[0].unit_produced))
+        other = get_factory(failing_conf, seed=4)
+        other.run(24 * 60)
+        assert_that(other.production_units[0].unit_produced, is_not(results[0][0]))
+
+    def test_mttr_goes_with_mtbf(self):
+        try:
+            get_factory(failing_conf.replace("      mttr: 0.5\n", ""))
+        except ConfigurationError, e:
+            assert_that(e.path, is_("production_units[0].mttr"))
+        else:
+            self.fail("ConfigurationError not raised")
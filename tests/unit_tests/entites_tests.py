@@ -1,14 +1,18 @@
+import gc
 import core
 
 from unittest import TestCase
 
+from core import Simulation
+from core.factory import Factory
 from core.production_unit import ProductionUnit
+from core.worker import Worker
 
 class TestEntities(TestCase):
 
     @classmethod
     def setUpClass(cls):
-        core.ref_counter = 1
+        core.reset_entities()
 
     def setUp(self):
         self.pu = ProductionUnit(None)
@@ -20,3 +24,37 @@ class TestEntities(TestCase):
 
     def test_get_by_ref(self):
         self.assertEquals(core.Entity.get_by_ref(self.pu.reference), self.pu)
+
+    def test_get_by_name(self):
+        self.pu.name = "loom"
+        self.assertEquals(ProductionUnit.get_by_name("loom"), self.pu)
+        self.pu.name = "spinner"
+        self.assertEquals(ProductionUnit.get_by_name("loom"), None)
+
+
+class TestRegistry(TestCase):
+
+    def test_entities_are_weakly_referenced(self):
+        with Simulation() as simulation:
+            pu = ProductionUnit(None)
+            reference = pu.reference
+            self.assertEquals(len(simulation.registry), 1)
+            del pu
+            gc.collect()
+            self.assertEquals(core.Entity.get_by_ref(reference), None)
+
+    def test_simulations_are_isolated(self):
+        with Simulation() as simulation:
+            pu = ProductionUnit(None)
+        self.assertEquals(pu.reference, 1)
+        self.assertEquals(simulation.registry.get(1), pu)
+        self.assertNotEquals(core.Entity.get_by_ref(1), pu)
+
+    def test_teardown_factory(self):
+        with Simulation() as simulation:
+            factory = Factory(name="textil")
+            factory.add_production_unit(ProductionUnit(None, name="loom"))
+            factory.add_worker(Worker())
+            simulation.registry.teardown(factory)
+            self.assertEquals(len(simulation.registry), 0)
+            self.assertEquals(Factory.get_by_name("textil"), None)
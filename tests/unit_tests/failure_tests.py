@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from core.event import Failure, Fix
+from core.factory import Factory
+from core.failure import Breakdowns
+from core.production_unit import ProductionUnit
+from tests.utils import create_machine
+
+
+class TestBreakdowns(TestCase):
+
+    def setUp(self):
+        self.factory = Factory()
+        self.machine, spec, zone = create_machine(material_type_input="wood")
+        self.machine.config.update({"mtbf": 60, "mttr": 10})
+        self.factory.add_production_unit(self.machine)
+        self.factory.add_production_unit(create_machine(material_type_input="wood")[0])
+
+    def test_failures_alternate_with_fixes(self):
+        breakdowns = Breakdowns(seed=1)
+        breakdowns.start(self.factory)
+        self.assertEquals(len(breakdowns), 1)
+        failure = breakdowns.next_time()
+        self.assertTrue(failure >= 1)
+        [event] = breakdowns.pop(failure)
+        self.assertTrue(isinstance(event, Failure) and event.entity is self.machine)
+        self.assertTrue(breakdowns.next_time() > failure)
+        [event] = breakdowns.pop(breakdowns.next_time())
+        self.assertTrue(isinstance(event, Fix))
+
+    def test_seeded_draws(self):
+        first, second = Breakdowns(seed=[3, 0]), Breakdowns(seed=[3, 0])
+        for breakdowns in (first, second):
+            breakdowns.start(self.factory)
+        draws = [[breakdowns.draw(self.machine, "mttr") for i in range(2000)] for breakdowns in (first, second)]
+        self.assertEquals(draws[0], draws[1])
+        self.assertTrue(min(draws[0]) >= 1)
+        self.assertTrue(9 < float(sum(draws[0])) / len(draws[0]) < 12)
+
+    def test_factory_breaks_down(self):
+        self.factory.simulate_failures(Breakdowns(seed=1))
+        failure = self.factory.failures.next_time()
+        self.factory.time = failure
+        self.factory.apply_failures()
+        self.assertEquals(self.machine.get_state(), ProductionUnit.FAILURE)
+        self.factory.time = self.factory.failures.next_time()
+        self.factory.apply_failures()
+        self.assertEquals(self.machine.get_state(), ProductionUnit.STARTED)
@@ -24,3 +24,7 @@ class InputTest(TestCase):
 	sum_material = self.input + other
         self.assertEquals(sum_material, (self.input, other))
 	
+
+    def test_material_types_are_interned(self):
+        self.assertEquals(Material("input").type_id, self.input.type_id)
+        self.assertNotEquals(Material("other").type_id, self.input.type_id)
@@ -1,7 +1,7 @@
 from unittest.case import TestCase
 from core.event import NoWorkerToPerformAction
 from core.material import Material
-from core.operation import LoadOperation, ProduceOperation, StartOperation, AllInOneLoadOperation
+from core.operation import LoadOperation, ProduceOperation, StartOperation, AllInOneLoadOperation, NEVER
 from core.production_unit import ProductionUnit
 from core.specification import MaterialInputConstraint, Specification
 from core.worker import Worker
@@ -56,4 +56,43 @@ class TestOperation(TestCase):
         self.assertEquals(len(self.machine.get_outputs()), 1)
 
     def test_has_worker_constraint(self):
-        self.assertRaises(NoWorkerToPerformAction, LoadOperation(Material("k"), self.machine).run)
\ No newline at end of file
+        self.assertRaises(NoWorkerToPerformAction, LoadOperation(Material("k"), self.machine).run)
+
+    def test_load_less_than_one_by_step(self):
+        load_op = LoadOperation(Material("wood", quantity=2), production_unit=self.machine, time_to_perform=3,
+                                worker=self.worker)
+        self.assertEquals(load_op.ticks_until_complete(), 3)
+
+        load_op.run(during=1)
+        self.assertEquals(self.machine.inputs.count(), 0)
+        self.assertEquals(load_op.ticks_until_complete(), 2)
+
+        load_op.run(during=2)
+        self.assertEquals(self.machine.inputs.count(), 2)
+        self.assertTrue(load_op.is_operation_complete())
+
+    def test_exact_progress(self):
+        StartOperation(production_unit=self.machine, worker=self.worker).run(during=1)
+        self.machine.rate = 0.1
+        LoadOperation(self.input, production_unit=self.machine, time_to_perform=1, worker=self.worker).run(during=1)
+        produce_op = ProduceOperation(production_unit=self.machine)
+
+        produce_op.run(during=2)
+        self.assertEquals(produce_op.progress, 0.3)
+        self.assertEquals(produce_op.ticks_until_complete(), 7)
+        produce_op.run(during=7)
+        self.assertEquals(self.machine.unit_produced, 0)
+        produce_op.run(during=1)
+        self.assertEquals(self.machine.unit_produced, 1)
+
+    def test_rate_changed_while_producing(self):
+        StartOperation(production_unit=self.machine, worker=self.worker).run(during=1)
+        LoadOperation(self.input, production_unit=self.machine, time_to_perform=1, worker=self.worker).run(during=1)
+        produce_op = ProduceOperation(production_unit=self.machine)
+        produce_op.run(during=1)
+        self.assertEquals(produce_op.progress, 0.5)
+
+        self.machine.rate = 1.0 / 6
+        self.assertEquals(produce_op.ticks_until_complete(), 3)
+        self.machine.rate = 0.3
+        self.assertEquals(produce_op.ticks_until_complete(), NEVER)
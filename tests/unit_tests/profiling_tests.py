@@ -0,0 +1,46 @@
+from unittest.case import TestCase
+import json
+from core.factory import Factory
+from core.profiling import Profiler
+from core.worker import Worker
+from hamcrest import *
+from tests.utils import create_machine
+
+
+class TestProfiling(TestCase):
+
+    def setUp(self):
+        self.factory = Factory()
+        self.machine, spec, zone = create_machine(material_type_input="yarn", stocking_zone_size=None)
+        self.machine.name = "loom"
+        self.factory.add_production_unit(self.machine)
+        self.factory.add_worker(Worker())
+
+    def test_disabled_by_default(self):
+        self.factory.run(5)
+        assert_that(self.factory.profiler, is_(none()))
+
+    def test_profile_operations_by_phase(self):
+        profiler = self.factory.enable_profiling()
+        self.factory.run(5)
+
+        stats = profiler.as_dict()
+        assert_that(stats["operations"]["StartOperation"]["check"]["calls"], is_(1))
+        assert_that(stats["operations"]["StartOperation"]["completion"]["calls"], is_(1))
+        assert_that(stats["operations"]["LoadOperation"]["step"]["calls"], is_(2))
+        assert_that(stats["production_units"]["loom"]["step"]["calls"], is_(5))
+        assert_that(stats["production_units"]["loom"]["step"]["seconds"], greater_than_or_equal_to(0))
+        assert_that(json.loads(profiler.to_json()), is_(stats))
+
+    def test_profile_skipped_steps(self):
+        self.machine.rate = 0.25
+        profiler = self.factory.enable_profiling()
+        self.factory.run(20, event_driven=True)
+        assert_that(profiler.as_dict()["production_units"]["loom"], has_key("skip"))
+
+    def test_reset(self):
+        profiler = Profiler()
+        self.factory.profiler = profiler
+        self.factory.run(2)
+        profiler.reset()
+        assert_that(profiler.as_dict(), is_({"operations": {}, "production_units": {}}))
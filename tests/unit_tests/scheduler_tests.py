@@ -0,0 +1,127 @@
+from unittest import TestCase
+
+from core.operation import StartOperation, LoadOperation
+from core.material import Material
+from core.scheduler import COMPACTION_SLACK, EventQueue, WorkerPool, least_loaded, specialist_first, earliest_shift_end
+from core.specification import SkillConstraint
+from core.worker import Worker
+from tests.utils import create_machine
+
+class TestEventQueue(TestCase):
+
+    def test_pop_due_events_by_rank(self):
+        events = EventQueue()
+        events.push(5, 2, "late")
+        events.push(3, 1, "second")
+        events.push(3, 0, "first")
+        self.assertEquals(events.next_time(), 3)
+        self.assertEquals(events.pop(3), [(0, "first"), (1, "second")])
+        self.assertEquals(len(events), 1)
+
+
+class TestQuietSteps(TestCase):
+
+    def setUp(self):
+        self.machine, spec, zone = create_machine(material_type_input="wood")
+        self.worker = Worker(working_hour=10)
+        StartOperation(self.machine, worker=self.worker).run()
+
+    def test_load_operation_is_quiet_until_completion(self):
+        load_op = LoadOperation(Material("wood", 8), production_unit=self.machine, time_to_perform=4, worker=self.worker)
+        load_op.run()
+        self.assertEquals(load_op.quiet_steps(), 2)
+        load_op.skip(2)
+        self.assertEquals(self.machine.inputs.count(), 6)
+        self.assertEquals(load_op.progress, 0.75)
+
+    def test_quiet_steps_stop_at_end_of_shift(self):
+        load_op = LoadOperation(Material("wood", 64), production_unit=self.machine, time_to_perform=32, worker=self.worker)
+        self.assertEquals(load_op.quiet_steps(), 9)
+
+
+def create_worker(hour_worked=0, skills=(), working_hour=8 * 60):
+    worker = Worker(working_hour=working_hour)
+    worker.hour_worked = hour_worked
+    worker.skills.extend(skills)
+    return worker
+
+
+class TestWorkerPool(TestCase):
+
+    def setUp(self):
+        self.machine, spec, zone = create_machine(material_type_input="wood")
+
+    def load(self, *skills):
+        operation = LoadOperation(Material("wood"), production_unit=self.machine)
+        for skill in skills:
+            operation.add_constraint(SkillConstraint(skill))
+        return operation
+
+    def test_last_released_first(self):
+        pool = WorkerPool()
+        first, second = Worker(), Worker()
+        pool.add(first)
+        pool.add(second)
+        self.assertIs(pool.acquire(self.load()), second)
+        self.assertIs(pool.acquire(self.load()), first)
+        self.assertIs(pool.acquire(self.load()), None)
+
+    def test_policies(self):
+        tired, rested = create_worker(hour_worked=300), create_worker(hour_worked=10)
+        pool = WorkerPool(least_loaded)
+        pool.add(rested)
+        pool.add(tired)
+        self.assertIs(pool.acquire(self.load()), rested)
+
+        pool = WorkerPool(earliest_shift_end)
+        pool.add(rested)
+        pool.add(tired)
+        self.assertIs(pool.acquire(self.load()), tired)
+
+        specialist, versatile = create_worker(skills=["weld"]), create_worker(skills=["weld", "cut"])
+        pool = WorkerPool(specialist_first)
+        pool.add(versatile)
+        pool.add(specialist)
+        self.assertIs(pool.acquire(self.load("weld")), specialist)
+
+    def test_acquire_by_skill(self):
+        pool = WorkerPool()
+        welder, cutter = create_worker(skills=["weld"]), create_worker(skills=["cut"])
+        pool.add(welder)
+        pool.add(cutter)
+        self.assertIs(pool.acquire(self.load("weld")), welder)
+        self.assertIs(pool.acquire(self.load("weld")), None)
+        self.assertIs(pool.acquire(self.load()), cutter)
+
+    def test_heaps_stay_compact(self):
+        pool = WorkerPool()
+        sawyer = create_worker(skills=["saw"])
+        pool.add(sawyer)
+        operation = self.load()
+        for i in range(10000):
+            self.assertIs(pool.acquire(operation), sawyer)
+            pool.release(sawyer)
+        self.assertTrue(len(pool.any) <= 2 * len(pool) + COMPACTION_SLACK + 1)
+        self.assertTrue(len(pool.by_skill["saw"]) <= 2 * len(pool) + COMPACTION_SLACK + 1)
+        self.assertIs(pool.acquire(self.load("saw")), sawyer)
+
+    def test_released_worker_is_kept_for_the_first_waiting_operation(self):
+        pool = WorkerPool()
+        worker = Worker()
+        pool.add(worker)
+        self.assertIs(pool.acquire(self.load()), worker)
+        first, second = self.load(), self.load()
+        self.assertIs(pool.acquire(second), None)
+        self.assertIs(pool.acquire(first), None)
+        self.assertTrue(pool.can_staff_later(first))
+
+        pool.release(worker)
+        self.assertIs(pool.acquire(first), None)
+        self.assertIs(pool.acquire(second), worker)
+
+    def test_worker_without_hours_is_not_available(self):
+        pool = WorkerPool()
+        worker = create_worker(hour_worked=10, working_hour=10)
+        pool.add(worker)
+        self.assertIs(pool.acquire(self.load()), None)
+        self.assertFalse(pool.can_staff_later(self.load()))
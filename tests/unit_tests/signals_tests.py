@@ -1,7 +1,41 @@
 from unittest import TestCase
 
+from core.event import DayOfWorkIsOver, Failure, Fix, StockIsFull
 from core.production_unit import ProductionUnit
+from core.signals import SignalBus
+from core.worker import Worker
+from hamcrest import *
 
 class TestSignals(TestCase):
     def test_signals_generated(self):
         pu = ProductionUnit(None)
+        pu.signals = SignalBus()
+        worker = Worker(working_hour=1)
+        worker.signals = pu.signals
+        received = []
+        pu.signals.subscribe(DayOfWorkIsOver, received.append)
+
+        assert_that(worker.add_unit_of_work(), is_(True))
+        assert_that(worker.add_unit_of_work(), is_(False))
+        assert_that(received, is_([]))
+        pu.signals.drain()
+        assert_that(len(received), is_(1))
+        assert_that(received[0].entity, is_(worker))
+
+    def test_subscribers_receive_subclasses(self):
+        bus = SignalBus()
+        received = []
+        bus.subscribe(Exception, received.append)
+        bus.emit(StockIsFull(None))
+        bus.drain()
+        assert_that(len(received), is_(1))
+
+    def test_failure_and_fix_react_on_their_entity(self):
+        pu = ProductionUnit(None)
+        bus = SignalBus()
+        bus.emit(Failure(pu))
+        bus.drain()
+        assert_that(pu.get_state(), is_(ProductionUnit.FAILURE))
+        bus.emit(Fix(pu))
+        bus.drain()
+        assert_that(pu.get_state(), is_(ProductionUnit.STARTED))
@@ -0,0 +1,50 @@
+from unittest.case import TestCase
+from core import Simulation
+from core.factory import Factory
+from core.snapshot import snapshot, restore, fork
+from core.worker import Worker
+from hamcrest import *
+from tests.utils import create_machine
+
+
+def create_factory():
+    factory = Factory(name="textil")
+    machine, spec, zone = create_machine(material_type_input="yarn", stocking_zone_size=None, rate=0.5)
+    machine.name = "loom"
+    factory.add_production_unit(machine)
+    factory.add_worker(Worker(working_hour=100))
+    return factory
+
+
+class TestSnapshot(TestCase):
+
+    def test_restored_factory_carries_on_like_the_original(self):
+        factory = create_factory()
+        factory.run(31)
+        restored = restore(snapshot(factory))
+
+        assert_that(restored.time, is_(31))
+        assert_that(restored.workers[0].hour_worked, is_(factory.workers[0].hour_worked))
+        assert_that(restored.production_units[0].output_stocking_zone.count(),
+                    is_(factory.production_units[0].output_stocking_zone.count()))
+
+        factory.run(50)
+        restored.run(50)
+        assert_that(restored.production_units[0].unit_produced, is_(factory.production_units[0].unit_produced))
+        assert_that(restored.production_units[0].output_stocking_zone.stock,
+                    is_(factory.production_units[0].output_stocking_zone.stock))
+        assert_that([operation.progress for operation in restored.current_operations],
+                    is_([operation.progress for operation in factory.current_operations]))
+
+    def test_forks_are_independent_entities(self):
+        with Simulation() as simulation:
+            factory = create_factory()
+            factory.run(10)
+            first, second = fork(snapshot(factory), 2)
+            first.run(10)
+
+            assert_that(second.time, is_(10))
+            assert_that(first.reference, is_not(second.reference))
+            assert_that(simulation.registry.get(first.reference), is_(first))
+            assert_that(first.workers[0], is_not(factory.workers[0]))
+            assert_that(first.workers[0].signals, is_(first.signals))
@@ -2,6 +2,7 @@ from unittest import TestCase
 
 from core.specification import Specification, MaterialInputConstraint
 from core.material import Material
+from core.production_unit import StockingZone
 
 class SpecificationTest(TestCase):
 
@@ -23,4 +24,25 @@ class SpecificationTest(TestCase):
 
     def test_get_inputs(self):
         self.assertEquals(self.spec.get_inputs()[0], Material("flour", 1))
-        self.assertEquals(self.spec.get_inputs()[1], Material("water", 2))
\ No newline at end of file
+        self.assertEquals(self.spec.get_inputs()[1], Material("water", 2))
+
+    def test_validate_stocking_zone(self):
+        zone = StockingZone()
+        zone.add_to_stock([Material("flour", 3), Material("water", 1)])
+        self.assertFalse(self.spec.validate_all(zone))
+
+        zone.add_to_stock(Material("water", 1))
+        self.assertTrue(self.spec.validate_all(zone))
+
+        zone.remove(Material("flour", 3))
+        self.assertFalse(self.spec.validate_all(zone))
+
+    def test_zones_sharing_a_specification(self):
+        # zones at the same version with different contents, like two factories of a blueprint
+        full, empty = StockingZone(), StockingZone()
+        full.add_to_stock([Material("flour", 1), Material("water", 2)])
+        empty.add_to_stock([Material("flour", 1), Material("salt", 2)])
+        self.assertEquals(full.version, empty.version)
+        for i in range(2):
+            self.assertTrue(self.spec.validate_all(full))
+            self.assertFalse(self.spec.validate_all(empty))
@@ -1,5 +1,6 @@
 from unittest.case import TestCase
 from core.event import Event
+from core.shift import DAY, HOUR, ShiftCalendar
 from core.worker import Worker
 
 class TestWorker(TestCase):
@@ -7,4 +8,39 @@ class TestWorker(TestCase):
     def test_working_hour(self):
         worker = Worker(working_hour=1)
         worker.add_unit_of_work()
-        self.assertRaises(Event, worker.add_unit_of_work)
\ No newline at end of file
+        self.assertRaises(Event, worker.add_unit_of_work)
+
+    def test_shift_renews_working_hour(self):
+        worker = Worker(working_hour=0)
+        worker.start_shift(2)
+        worker.add_unit_of_work(2)
+        self.assertEquals(worker.remaining_hours(), 0)
+        worker.start_shift(3)
+        self.assertEquals(worker.remaining_hours(), 3)
+        worker.end_shift()
+        self.assertRaises(Event, worker.add_unit_of_work)
+        self.assertEquals(worker.hour_worked, 2)
+
+
+class TestShiftCalendar(TestCase):
+
+    def test_day_shift(self):
+        calendar = ShiftCalendar([(6 * HOUR, 14 * HOUR)])
+        self.assertIsNone(calendar.get_interval(0))
+        self.assertEquals(calendar.next_change(0), 6 * HOUR)
+        self.assertEquals(calendar.get_interval(DAY + 7 * HOUR), (DAY + 6 * HOUR, DAY + 14 * HOUR))
+        self.assertEquals(calendar.next_change(DAY + 14 * HOUR), 2 * DAY + 6 * HOUR)
+
+    def test_night_shift_with_break_and_days_off(self):
+        calendar = ShiftCalendar.weekly(22 * HOUR, 8 * HOUR, breaks=[(4 * HOUR, 30)], days_off=[5, 6])
+        self.assertEquals(calendar.get_interval(23 * HOUR), (22 * HOUR, DAY + 2 * HOUR))
+        self.assertIsNone(calendar.get_interval(DAY + 2 * HOUR + 10))
+        self.assertEquals(calendar.next_change(DAY + 2 * HOUR), DAY + 2 * HOUR + 30)
+        # the shift of friday night ends on saturday, none starts before monday night
+        self.assertEquals(calendar.get_interval(5 * DAY + 5 * HOUR), (5 * DAY + 2 * HOUR + 30, 5 * DAY + 6 * HOUR))
+        self.assertEquals(calendar.next_change(5 * DAY + 6 * HOUR), 7 * DAY + 22 * HOUR)
+
+    def test_touching_shifts_are_merged(self):
+        calendar = ShiftCalendar([(0, 8 * HOUR), (8 * HOUR, 16 * HOUR), (16 * HOUR, DAY)])
+        self.assertEquals(calendar.get_interval(3 * DAY)[1], float("inf"))
+        self.assertEquals(calendar.next_change(3 * DAY), float("inf"))